@@ -2,7 +2,7 @@ from flask import Flask, request, jsonify
 import os
 from flask_cors import CORS
 import openai
-from openai import AzureOpenAI
+from openai import AzureOpenAI, AsyncAzureOpenAI
 import time
 import json
 import logging
@@ -13,12 +13,19 @@ from db_templates import get_db_template
 from prompts import (
     create_business_requirements_prompt,
     create_technical_requirements_prompt,
-    create_csharp_code_conversion_prompt,
-    create_java_code_conversion_prompt,
+    create_csharp_code_conversion_prompt_blocks,
+    create_java_code_conversion_prompt_blocks,
+    create_code_conversion_prompt,
+    create_db_usage_reminder,
+    create_test_context_prompt,
     create_unit_test_prompt,
-    create_functional_test_prompt
+    create_functional_test_prompt,
+    format_structured_conversion,
+    CONVERSION_RESPONSE_FORMAT
 )
 from db_usage import detect_database_usage
+from prompt_response_cache import get_or_generate, cached_llm_call
+from llm_dispatch import run_concurrently
 
 # Configure logging
 logging.basicConfig(
@@ -38,113 +45,143 @@ CORS(app)  # Enable CORS for all routes
 AZURE_OPENAI_ENDPOINT = os.environ.get("AZURE_OPENAI_ENDPOINT", "your-azure-openai-endpoint")
 AZURE_OPENAI_API_KEY = os.environ.get("AZURE_OPENAI_API_KEY", "your-azure-openai-key")
 AZURE_OPENAI_DEPLOYMENT_NAME = os.environ.get("AZURE_OPENAI_DEPLOYMENT_NAME", "your-deployment-name")
+# Token budget for conversion prompts; larger prompts drop the business and technical requirements
+MAX_INPUT_TOKENS = int(os.environ.get("MAX_INPUT_TOKENS", 100000))
+
+# Response format of the Java and C# conversions, whose prompts lay out the code in ## sections
+SECTIONED_CONVERSION_OUTPUT = (
+    "Follow the layered architecture structure specified in the prompt, with all of its sections in convertedCode. "
+    "Return your response in JSON format always with the following structure:\n"
+    "{\n"
+    '  "convertedCode": "The complete converted code here",\n'
+    '  "conversionNotes": "Notes about the conversion process",\n'
+    '  "potentialIssues": ["List of any potential issues or limitations"],\n'
+    '  "databaseUsed": true/false\n'
+    "}\n"
+    "IMPORTANT: Always return the response in JSON format. Do not ignore this requirement under any circumstances."
+)
 
 # Initialize OpenAI client
 client = AzureOpenAI(
     api_key=AZURE_OPENAI_API_KEY,
-    api_version="2023-05-15",
+    api_version="2024-10-21",
     azure_endpoint=AZURE_OPENAI_ENDPOINT,
 )
 
 
-def extract_json_from_response(text):
+def create_async_client():
+    """Create an async OpenAI client for dispatching concurrent requests"""
+    return AsyncAzureOpenAI(
+        api_key=AZURE_OPENAI_API_KEY,
+        api_version="2024-10-21",
+        azure_endpoint=AZURE_OPENAI_ENDPOINT,
+    )
+
+
+def parse_json_response(text):
     """
-    Extract JSON content from the response text.
-    Handle cases where the model might wrap JSON in markdown code blocks,
-    add additional text, or return truncated/incomplete JSON.
+    Parse a response that holds complete JSON, either as the whole text
+    or wrapped in a markdown code block.
+    Returns None if the response needs repair or cannot be parsed.
     """
-    import json
-    import re
-    import logging
-    logger = logging.getLogger(__name__)
-    
     try:
         # First, try to parse the whole text as JSON
         return json.loads(text)
     except json.JSONDecodeError:
-        logger.info("Direct JSON parsing failed, trying alternative methods")
-        
         # Try to extract JSON from markdown code blocks
-        json_pattern = r'```(?:json)?\s*([\s\S]*?)\s*```'
-        matches = re.findall(json_pattern, text)
-        
-        if matches:
-            # Try each potential JSON block
-            for match in matches:
-                try:
-                    return json.loads(match)
-                except json.JSONDecodeError:
-                    continue
-        
-        # Look for JSON-like structures with repair attempt for truncated JSON
-        try:
-            # Find text between curly braces including nested braces
-            # First, check if we have an opening brace but incomplete JSON
-            if text.count('{') > text.count('}'):
-                logger.info("Detected potentially truncated JSON, attempting repair")
-                
-                # Basic repair for common truncation issues
-                # This won't handle all cases but covers many scenarios
-                if '"convertedCode"' in text and '"conversionNotes"' in text:
-                    # Extract what we have between the main braces
-                    main_content = re.search(r'{(.*)', text)
-                    if main_content:
-                        content = main_content.group(0)
-                        
-                        # Check if we have the convertedCode field but it's incomplete
-                        code_match = re.search(r'"convertedCode"\s*:\s*"(.*?)(?<!\\)"', content)
-                        if code_match:
-                            # We have complete convertedCode
-                            code = code_match.group(1)
-                        else:
-                            # Truncated in the middle of convertedCode
-                            code_start = re.search(r'"convertedCode"\s*:\s*"(.*)', content)
-                            if code_start:
-                                code = code_start.group(1)
-                            else:
-                                code = ""
-                        
-                        # Check for conversionNotes
-                        notes_match = re.search(r'"conversionNotes"\s*:\s*"(.*?)(?<!\\)"', content)
-                        if notes_match:
-                            notes = notes_match.group(1)
-                        else:
-                            notes = "Truncated during processing"
-                        
-                        # Create a valid JSON object with what we could extract
-                        return {
-                            "convertedCode": code.replace('\\n', '\n').replace('\\"', '"'),
-                            "conversionNotes": notes,
-                            "potentialIssues": ["Response was truncated - some content may be missing"]
-                        }
-            
-            # If repair didn't work, try to find complete JSON objects
-            brace_pattern = r'({[\s\S]*?})'
-            potential_jsons = re.findall(brace_pattern, text)
-            
-            for potential_json in potential_jsons:
-                try:
-                    if len(potential_json) > 20:  # Avoid tiny fragments
-                        return json.loads(potential_json)
-                except json.JSONDecodeError:
-                    continue
-            
-            logger.warning("Could not extract valid JSON from response")
-            
-            # Last resort: create a minimal valid response with whatever we got
-            return {
-                "convertedCode": "Extraction failed - see raw response",
-                "conversionNotes": "JSON parsing failed. The model response may have been truncated.",
-                "potentialIssues": ["JSON extraction failed"],
-                "raw_text": text[:1000] + "..." if len(text) > 1000 else text  # Include part of raw text
-            }
+        for match in re.findall(r'```(?:json)?\s*([\s\S]*?)\s*```', text):
+            try:
+                return json.loads(match)
+            except json.JSONDecodeError:
+                continue
+    return None
+
+
+def is_complete_json_response(text):
+    """Whether a response parses as JSON without repair, so it is safe to cache"""
+    return parse_json_response(text) is not None
+
+
+def extract_json_from_response(text):
+    """
+    Extract JSON content from the response text.
+    Handle cases where the model might wrap JSON in markdown code blocks,
+    add additional text, or return truncated/incomplete JSON.
+    """
+    parsed = parse_json_response(text)
+    if parsed is not None:
+        return parsed
+
+    logger.info("JSON parsing failed, trying alternative methods")
+    # Look for JSON-like structures with repair attempt for truncated JSON
+    try:
+        # Find text between curly braces including nested braces
+        # First, check if we have an opening brace but incomplete JSON
+        if text.count('{') > text.count('}'):
+            logger.info("Detected potentially truncated JSON, attempting repair")
             
-        except Exception as e:
-            logger.error(f"Error extracting JSON: {str(e)}")
-            return {
-                "error": "JSON extraction failed",
-                "raw_text": text[:1000] + "..." if len(text) > 1000 else text
-            }
+            # Basic repair for common truncation issues
+            # This won't handle all cases but covers many scenarios
+            if '"convertedCode"' in text and '"conversionNotes"' in text:
+                # Extract what we have between the main braces
+                main_content = re.search(r'{(.*)', text)
+                if main_content:
+                    content = main_content.group(0)
+                    
+                    # Check if we have the convertedCode field but it's incomplete
+                    code_match = re.search(r'"convertedCode"\s*:\s*"(.*?)(?<!\\)"', content)
+                    if code_match:
+                        # We have complete convertedCode
+                        code = code_match.group(1)
+                    else:
+                        # Truncated in the middle of convertedCode
+                        code_start = re.search(r'"convertedCode"\s*:\s*"(.*)', content)
+                        if code_start:
+                            code = code_start.group(1)
+                        else:
+                            code = ""
+                    
+                    # Check for conversionNotes
+                    notes_match = re.search(r'"conversionNotes"\s*:\s*"(.*?)(?<!\\)"', content)
+                    if notes_match:
+                        notes = notes_match.group(1)
+                    else:
+                        notes = "Truncated during processing"
+                    
+                    # Create a valid JSON object with what we could extract
+                    return {
+                        "convertedCode": code.replace('\\n', '\n').replace('\\"', '"'),
+                        "conversionNotes": notes,
+                        "potentialIssues": ["Response was truncated - some content may be missing"]
+                    }
+        
+        # If repair didn't work, try to find complete JSON objects
+        brace_pattern = r'({[\s\S]*?})'
+        potential_jsons = re.findall(brace_pattern, text)
+        
+        for potential_json in potential_jsons:
+            try:
+                if len(potential_json) > 20:  # Avoid tiny fragments
+                    return json.loads(potential_json)
+            except json.JSONDecodeError:
+                continue
+        
+        logger.warning("Could not extract valid JSON from response")
+        
+        # Last resort: create a minimal valid response with whatever we got
+        return {
+            "convertedCode": "Extraction failed - see raw response",
+            "conversionNotes": "JSON parsing failed. The model response may have been truncated.",
+            "potentialIssues": ["JSON extraction failed"],
+            "raw_text": text[:1000] + "..." if len(text) > 1000 else text  # Include part of raw text
+        }
+        
+    except Exception as e:
+        logger.error(f"Error extracting JSON: {str(e)}")
+        return {
+            "error": "JSON extraction failed",
+            "raw_text": text[:1000] + "..." if len(text) > 1000 else text
+        }
 
 
 @app.route("/api/health", methods=["GET"])
@@ -175,86 +212,107 @@ def analyze_requirements():
         technical_prompt = create_technical_requirements_prompt(source_language, target_language, source_code, vsam_definition)
         
         # Call Azure OpenAI API for business requirements with JSON response format
-        business_response = client.chat.completions.create(
-            model=AZURE_OPENAI_DEPLOYMENT_NAME,
-            messages =[
-                {
-                    "role": "system",
-                    "content": (
-                        f"You are an expert in analyzing legacy code to extract business requirements. "
-                        f"You understand {source_language} deeply and can identify business rules and processes in the code. "
-                        f"Output your analysis in JSON format with the following structure:\n\n"
-                        f"{{\n"
-                        f'  "Overview": {{\n'
-                        f'    "Purpose of the System": "Describe the system\'s primary function and how it fits into the business.",\n'
-                        f'    "Context and Business Impact": "Explain the operational context and value the system provides."\n'
-                        f'  }},\n'
-                        f'  "Objectives": {{\n'
-                        f'    "Primary Objective": "Clearly state the system\'s main goal.",\n'
-                        f'    "Key Outcomes": "Outline expected results (e.g., improved processing speed, customer satisfaction)."\n'
-                        f'  }},\n'
-                        f'  "Business Rules & Requirements": {{\n'
-                        f'    "Business Purpose": "Explain the business objective behind this specific module or logic.",\n'
-                        f'    "Business Rules": "List the inferred rules/conditions the system enforces.",\n'
-                        f'    "Impact on System": "Describe how this part affects the system\'s overall operation.",\n'
-                        f'    "Constraints": "Note any business limitations or operational restrictions."\n'
-                        f'  }},\n'
-                        f'  "Assumptions & Recommendations": {{\n'
-                        f'    "Assumptions": "Describe what is presumed about data, processes, or environment.",\n'
-                        f'    "Recommendations": "Suggest enhancements or modernization directions."\n'
-                        f'  }},\n'
-                        f'  "Expected Output": {{\n'
-                        f'    "Output": "Describe the main outputs (e.g., reports, logs, updates).",\n'
-                        f'    "Business Significance": "Explain why these outputs matter for business processes."\n'
-                        f'  }}\n'
-                        f"}}"
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": business_prompt
-                }
-            ],
-
-            temperature=0.1,
-            max_tokens=2000,
-            response_format={"type": "json_object"}
-        )
+        async def generate_business_requirements(async_client):
+            business_response = await async_client.chat.completions.create(
+                model=AZURE_OPENAI_DEPLOYMENT_NAME,
+                messages =[
+                    {
+                        "role": "system",
+                        "content": (
+                            f"You are an expert in analyzing legacy code to extract business requirements. "
+                            f"You understand {source_language} deeply and can identify business rules and processes in the code. "
+                            f"Output your analysis in JSON format with the following structure:\n\n"
+                            f"{{\n"
+                            f'  "Overview": {{\n'
+                            f'    "Purpose of the System": "Describe the system\'s primary function and how it fits into the business.",\n'
+                            f'    "Context and Business Impact": "Explain the operational context and value the system provides."\n'
+                            f'  }},\n'
+                            f'  "Objectives": {{\n'
+                            f'    "Primary Objective": "Clearly state the system\'s main goal.",\n'
+                            f'    "Key Outcomes": "Outline expected results (e.g., improved processing speed, customer satisfaction)."\n'
+                            f'  }},\n'
+                            f'  "Business Rules & Requirements": {{\n'
+                            f'    "Business Purpose": "Explain the business objective behind this specific module or logic.",\n'
+                            f'    "Business Rules": "List the inferred rules/conditions the system enforces.",\n'
+                            f'    "Impact on System": "Describe how this part affects the system\'s overall operation.",\n'
+                            f'    "Constraints": "Note any business limitations or operational restrictions."\n'
+                            f'  }},\n'
+                            f'  "Assumptions & Recommendations": {{\n'
+                            f'    "Assumptions": "Describe what is presumed about data, processes, or environment.",\n'
+                            f'    "Recommendations": "Suggest enhancements or modernization directions."\n'
+                            f'  }},\n'
+                            f'  "Expected Output": {{\n'
+                            f'    "Output": "Describe the main outputs (e.g., reports, logs, updates).",\n'
+                            f'    "Business Significance": "Explain why these outputs matter for business processes."\n'
+                            f'  }}\n'
+                            f"}}"
+                        )
+                    },
+                    {
+                        "role": "user",
+                        "content": business_prompt
+                    }
+                ],
+
+                temperature=0.1,
+                max_tokens=2000,
+                response_format={"type": "json_object"}
+            )
         
-        # Log the complete raw business response
-        logger.info("=== RAW BUSINESS REQUIREMENTS RESPONSE ===")
-        logger.info(json.dumps(business_response.model_dump(), indent=2))
+            # Log the complete raw business response
+            logger.info("=== RAW BUSINESS REQUIREMENTS RESPONSE ===")
+            logger.info(json.dumps(business_response.model_dump(), indent=2))
+            return business_response.choices[0].message.content.strip()
         
         # Call Azure OpenAI API for technical requirements with JSON response format
-        technical_response = client.chat.completions.create(
-            model=AZURE_OPENAI_DEPLOYMENT_NAME,
-            messages=[
-                {
-                    "role": "system", 
-                    "content": f"You are an expert in {source_language} to {target_language} migration. "
-                              f"You deeply understand both languages and can identify technical challenges and requirements for migration. "
-                              f"Output your analysis in JSON format with the following structure:\n"
-                              f"{{\n"
-                              f'  "technicalRequirements": [\n'
-                              f'    {{"id": "TR1", "description": "First technical requirement", }},\n'
-                              f'    {{"id": "TR2", "description": "Second technical requirement", "complexity": "High/Medium/Low"}}\n'
-                              f'  ],\n'
-                              f"}}"
-                },
-                {"role": "user", "content": technical_prompt}
-            ],
-            temperature=0.1,
-            max_tokens=2000,
-            response_format={"type": "json_object"}
-        )
+        async def generate_technical_requirements(async_client):
+            technical_response = await async_client.chat.completions.create(
+                model=AZURE_OPENAI_DEPLOYMENT_NAME,
+                messages=[
+                    {
+                        "role": "system", 
+                        "content": f"You are an expert in {source_language} to {target_language} migration. "
+                                  f"You deeply understand both languages and can identify technical challenges and requirements for migration. "
+                                  f"Output your analysis in JSON format with the following structure:\n"
+                                  f"{{\n"
+                                  f'  "technicalRequirements": [\n'
+                                  f'    {{"id": "TR1", "description": "First technical requirement", }},\n'
+                                  f'    {{"id": "TR2", "description": "Second technical requirement", "complexity": "High/Medium/Low"}}\n'
+                                  f'  ],\n'
+                                  f"}}"
+                    },
+                    {"role": "user", "content": technical_prompt}
+                ],
+                temperature=0.1,
+                max_tokens=2000,
+                response_format={"type": "json_object"}
+            )
         
-        # Log the complete raw technical response
-        logger.info("=== RAW TECHNICAL REQUIREMENTS RESPONSE ===")
-        logger.info(json.dumps(technical_response.model_dump(), indent=2))
+            # Log the complete raw technical response
+            logger.info("=== RAW TECHNICAL REQUIREMENTS RESPONSE ===")
+            logger.info(json.dumps(technical_response.model_dump(), indent=2))
+            return technical_response.choices[0].message.content.strip()
+        
+        # Reuse cached responses for previously analyzed code
+        # Both analyses are independent, so their requests are sent concurrently
+        business_content, technical_content = run_concurrently(
+            create_async_client,
+            cached_llm_call(
+                "business_requirements",
+                {"source_language": source_language, "source_code": source_code, "vsam_definition": vsam_definition},
+                generate_business_requirements,
+                is_complete_json_response
+            ),
+            cached_llm_call(
+                "technical_requirements",
+                {"source_language": source_language, "target_language": target_language,
+                 "source_code": source_code, "vsam_definition": vsam_definition},
+                generate_technical_requirements,
+                is_complete_json_response
+            )
+        )
         
         # Extract and parse JSON from responses
-        business_content = business_response.choices[0].message.content.strip()
-        technical_content = technical_response.choices[0].message.content.strip()
         
         try:
             business_json = json.loads(business_content)
@@ -372,32 +430,37 @@ def convert_code():
             # Create appropriate prompt based on target language
             if target_language.lower() == "java":
                 # Import the Java-specific prompt function
-                prompt = create_java_code_conversion_prompt(
+                prompt_blocks = create_java_code_conversion_prompt_blocks(
                     source_language=source_language,
                     source_code=source_code,
                     business_requirements=business_requirements,
                     technical_requirements=technical_requirements,
                     db_setup_template=db_setup_template,
-                    vsam_definition=vsam_definition
+                    vsam_definition=vsam_definition,
+                    max_input_tokens=MAX_INPUT_TOKENS
                 )
                 framework_info = "Spring Boot framework"
+                response_format = {"type": "json_object"}
+                output_instructions = SECTIONED_CONVERSION_OUTPUT
                 
             elif target_language.lower() in ["c#", "csharp"]:
                 # Import the C#-specific prompt function
-                prompt = create_csharp_code_conversion_prompt(
+                prompt_blocks = create_csharp_code_conversion_prompt_blocks(
                     source_language=source_language,
                     source_code=source_code,
                     business_requirements=business_requirements,
                     technical_requirements=technical_requirements,
                     db_setup_template=db_setup_template,
-                    vsam_definition=vsam_definition
+                    vsam_definition=vsam_definition,
+                    max_input_tokens=MAX_INPUT_TOKENS
                 )
                 framework_info = ".NET Core/ASP.NET Core framework"
+                response_format = {"type": "json_object"}
+                output_instructions = SECTIONED_CONVERSION_OUTPUT
                 
             else:
                 # Fallback to generic conversion for other languages
                 logger.warning(f"No specific prompt function found for target language: {target_language}. Using generic conversion.")
-                from code_converter import create_code_conversion_prompt
                 prompt = create_code_conversion_prompt(
                     source_language=source_language,
                     target_language=target_language,
@@ -405,51 +468,69 @@ def convert_code():
                     business_requirements=business_requirements,
                     technical_requirements=technical_requirements,
                     db_setup_template=db_setup_template,
-                    vsam_definition=vsam_definition
+                    vsam_definition=vsam_definition,
+                    max_input_tokens=MAX_INPUT_TOKENS,
+                    structured_output=True
                 )
+                prompt_blocks = [{"type": "text", "text": prompt}]
                 framework_info = f"{target_language} best practices"
+                # Only the generic prompt lays out its sections as the fields of the response schema
+                response_format = CONVERSION_RESPONSE_FORMAT
+                output_instructions = (
+                    "Follow the layered architecture structure specified in the prompt, "
+                    "returning the files of each layer section in the matching field of the response schema."
+                )
 
-            # Add special instruction about database code
-            prompt += f"\n\nIMPORTANT: Only include database initialization code if the source {source_language} code contains database or SQL operations. If the code is a simple algorithm (like sorting, calculation, etc.) without any database interaction, do NOT include any database setup code in the converted {target_language} code."
+            # Add special instruction about database code after the cacheable prompt prefix
+            prompt_blocks.append({
+                "type": "text",
+                "text": create_db_usage_reminder(source_language, target_language)
+            })
 
             # Call Azure OpenAI API with JSON response format
-            response = client.chat.completions.create(
-                model=AZURE_OPENAI_DEPLOYMENT_NAME,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"You are an expert code converter assistant specializing in {source_language} to {target_language} migration using {framework_info}. "
-                                  f"You convert legacy code to modern, idiomatic code while maintaining all business logic. "
-                                  f"Only include database setup/initialization if the original code uses databases or SQL. "
-                                  f"For simple algorithms or calculations without database operations, don't add any database code. "
-                                  f"Follow the layered architecture structure specified in the prompt. "
-                                  f"Return your response in JSON format always with the following structure:\n"
-                                  f"{{\n"
-                                  f'  "convertedCode": "The complete converted code here",\n'
-                                  f'  "conversionNotes": "Notes about the conversion process",\n'
-                                  f'  "potentialIssues": ["List of any potential issues or limitations"],\n'
-                                  f'  "databaseUsed": true/false\n'
-                                  f"}}"
-                                  f"IMPORTANT: Always return the response in JSON format. Do not ignore this requirement under any circumstances."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                max_tokens=4000,
-                response_format={"type": "json_object"}
-            )
+            def generate_conversion():
+                response = client.chat.completions.create(
+                    model=AZURE_OPENAI_DEPLOYMENT_NAME,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": f"You are an expert code converter assistant specializing in {source_language} to {target_language} migration using {framework_info}. "
+                                      f"You convert legacy code to modern, idiomatic code while maintaining all business logic. "
+                                      f"Only include database setup/initialization if the original code uses databases or SQL. "
+                                      f"For simple algorithms or calculations without database operations, don't add any database code. "
+                                      f"{output_instructions}"
+                        },
+                        {"role": "user", "content": prompt_blocks}
+                    ],
+                    temperature=0.1,
+                    max_tokens=4000,
+                    response_format=response_format
+                )
 
-            # Log the complete raw conversion response
-            logger.info("=== RAW CODE CONVERSION RESPONSE ===")
-            logger.info(json.dumps(response.model_dump(), indent=2))
+                # Log the complete raw conversion response
+                logger.info("=== RAW CODE CONVERSION RESPONSE ===")
+                logger.info(json.dumps(response.model_dump(), indent=2))
+                return response.choices[0].message.content.strip()
+
+            conversion_content = get_or_generate(
+                "code_conversion",
+                {"source_language": source_language, "target_language": target_language,
+                 "source_code": source_code, "business_requirements": business_requirements,
+                 "technical_requirements": technical_requirements, "vsam_definition": vsam_definition},
+                generate_conversion,
+                is_complete_json_response
+            )
 
             # Parse the JSON response
-            conversion_content = response.choices[0].message.content.strip()
             try:
                 conversion_json = json.loads(conversion_content)
             except json.JSONDecodeError:
                 logger.warning("Failed to parse code conversion JSON directly")
                 conversion_json = extract_json_from_response(conversion_content)
+
+            # Render the structured layers as the sectioned code text returned to clients
+            if "convertedCode" not in conversion_json:
+                conversion_json["convertedCode"] = format_structured_conversion(conversion_json)
         
         # Extract conversion results
         converted_code = conversion_json.get("convertedCode", "")
@@ -457,65 +538,55 @@ def convert_code():
         potential_issues = conversion_json.get("potentialIssues", [])
         database_used = conversion_json.get("databaseUsed", False)
         
-        # Generate unit test cases based on the converted code and requirements
-        unit_test_prompt = create_unit_test_prompt(
+        # The converted code and requirements precede the instructions of both test requests
+        test_context = create_test_context_prompt(
             target_language,
             converted_code,
             business_requirements,
             technical_requirements
         )
+
+        # Generate unit test cases based on the converted code and requirements
+        unit_test_prompt = create_unit_test_prompt(target_language)
         
         # Update system message for unit tests based on target language
         if target_language.lower() == "java":
             test_framework_info = "JUnit 5 and Mockito for Spring Boot applications"
         elif target_language.lower() in ["c#", "csharp"]:
-            test_framework_info = "xUnit, NUnit, or MSTest for .NET Core applications"
+            test_framework_info = "xUnit and Moq for .NET Core applications"
         else:
             test_framework_info = f"appropriate testing frameworks for {target_language}"
         
-        unit_test_response = client.chat.completions.create(
-            model=AZURE_OPENAI_DEPLOYMENT_NAME,
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"You are an expert test engineer specializing in writing unit tests for {target_language} using {test_framework_info}. "
-                              f"You create comprehensive unit tests that verify all business logic and edge cases. "
-                              f"Follow the testing best practices for the target framework. "
-                              f"Return your response in JSON format with the following structure:\n"
-                              f"{{\n"
-                              f'  "unitTestCode": "The complete unit test code here",\n'
-                              f'  "testDescription": "Description of the test strategy",\n'
-                              f'  "coverage": ["List of functionalities covered by the tests"]\n'
-                              f"}}"
-                },
-                {"role": "user", "content": unit_test_prompt}
-            ],
-            temperature=0.1,
-            max_tokens=3000,
-            response_format={"type": "json_object"}
-        )
-        
-        # Log the complete raw unit test response
-        logger.info("=== RAW UNIT TEST RESPONSE ===")
-        logger.info(json.dumps(unit_test_response.model_dump(), indent=2))
-        
-        # Parse the JSON response
-        unit_test_content = unit_test_response.choices[0].message.content.strip()
-        try:
-            unit_test_json = json.loads(unit_test_content)
-        except json.JSONDecodeError:
-            logger.warning("Failed to parse unit test JSON directly")
-            unit_test_json = extract_json_from_response(unit_test_content)
+        async def generate_unit_tests(async_client):
+            unit_test_response = await async_client.chat.completions.create(
+                model=AZURE_OPENAI_DEPLOYMENT_NAME,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": f"You are an expert test engineer specializing in writing unit tests for {target_language} using {test_framework_info}. "
+                                  f"You create comprehensive unit tests that verify all business logic and edge cases. "
+                                  f"Follow the testing best practices for the target framework. "
+                                  f"Return your response in JSON format with the following structure:\n"
+                                  f"{{\n"
+                                  f'  "unitTestCode": "The complete unit test code here",\n'
+                                  f'  "testDescription": "Description of the test strategy",\n'
+                                  f'  "coverage": ["List of functionalities covered by the tests"]\n'
+                                  f"}}"
+                    },
+                    {"role": "user", "content": test_context + unit_test_prompt}
+                ],
+                temperature=0.1,
+                max_tokens=3000,
+                response_format={"type": "json_object"}
+            )
         
-        unit_test_code_raw = unit_test_json.get("unitTestCode", "")
-        unit_test_code = re.sub(r"^```[a-zA-Z]*\s*|\s*```$", "", unit_test_code_raw.strip())
+            # Log the complete raw unit test response
+            logger.info("=== RAW UNIT TEST RESPONSE ===")
+            logger.info(json.dumps(unit_test_response.model_dump(), indent=2))
+            return unit_test_response.choices[0].message.content.strip()
         
         # Generate functional test cases based on business requirements
-        functional_test_prompt = create_functional_test_prompt(
-            target_language,
-            converted_code,
-            business_requirements
-        )
+        functional_test_prompt = create_functional_test_prompt(target_language)
         
         # Update system message for functional tests based on target language
         if target_language.lower() == "java":
@@ -525,36 +596,65 @@ def convert_code():
         else:
             functional_test_info = f"appropriate integration testing frameworks for {target_language}"
         
-        functional_test_response = client.chat.completions.create(
-            model=AZURE_OPENAI_DEPLOYMENT_NAME,
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"You are an expert QA engineer specializing in creating functional tests for {target_language} applications using {functional_test_info}. "
-                              f"You create comprehensive test scenarios that verify the application meets all business requirements. "
-                              f"Focus on user journey tests and acceptance criteria. "
-                              f"Return your response in JSON format with the following structure:\n"
-                              f"{{\n"
-                              f'  "functionalTests": [\n'
-                              f'    {{"id": "FT1", "title": "Test scenario title", "steps": ["Step 1", "Step 2"], "expectedResult": "Expected outcome"}},\n'
-                              f'    {{"id": "FT2", "title": "Another test scenario", "steps": ["Step 1", "Step 2"], "expectedResult": "Expected outcome"}}\n'
-                              f'  ],\n'
-                              f'  "testStrategy": "Description of the overall testing approach"\n'
-                              f"}}"
-                },
-                {"role": "user", "content": functional_test_prompt}
-            ],
-            temperature=0.1,
-            max_tokens=3000,
-            response_format={"type": "json_object"}
+        async def generate_functional_tests(async_client):
+            functional_test_response = await async_client.chat.completions.create(
+                model=AZURE_OPENAI_DEPLOYMENT_NAME,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": f"You are an expert QA engineer specializing in creating functional tests for {target_language} applications using {functional_test_info}. "
+                                  f"You create comprehensive test scenarios that verify the application meets all business requirements. "
+                                  f"Focus on user journey tests and acceptance criteria. "
+                                  f"Return your response in JSON format with the following structure:\n"
+                                  f"{{\n"
+                                  f'  "functionalTests": [\n'
+                                  f'    {{"id": "FT1", "title": "Test scenario title", "steps": ["Step 1", "Step 2"], "expectedResult": "Expected outcome"}},\n'
+                                  f'    {{"id": "FT2", "title": "Another test scenario", "steps": ["Step 1", "Step 2"], "expectedResult": "Expected outcome"}}\n'
+                                  f'  ],\n'
+                                  f'  "testStrategy": "Description of the overall testing approach"\n'
+                                  f"}}"
+                    },
+                    {"role": "user", "content": test_context + functional_test_prompt}
+                ],
+                temperature=0.1,
+                max_tokens=3000,
+                response_format={"type": "json_object"}
+            )
+        
+            # Log the complete raw functional test response
+            logger.info("=== RAW FUNCTIONAL TEST RESPONSE ===")
+            logger.info(json.dumps(functional_test_response.model_dump(), indent=2))
+            return functional_test_response.choices[0].message.content.strip()
+        
+        # Unit and functional tests are independent, so their requests are sent concurrently
+        unit_test_content, functional_test_content = run_concurrently(
+            create_async_client,
+            cached_llm_call(
+                "unit_tests",
+                {"target_language": target_language, "converted_code": converted_code,
+                 "business_requirements": business_requirements, "technical_requirements": technical_requirements},
+                generate_unit_tests,
+                is_complete_json_response
+            ),
+            cached_llm_call(
+                "functional_tests",
+                {"target_language": target_language, "converted_code": converted_code,
+                 "business_requirements": business_requirements, "technical_requirements": technical_requirements},
+                generate_functional_tests,
+                is_complete_json_response
+            )
         )
         
-        # Log the complete raw functional test response
-        logger.info("=== RAW FUNCTIONAL TEST RESPONSE ===")
-        logger.info(json.dumps(functional_test_response.model_dump(), indent=2))
+        # Parse the JSON responses
+        try:
+            unit_test_json = json.loads(unit_test_content)
+        except json.JSONDecodeError:
+            logger.warning("Failed to parse unit test JSON directly")
+            unit_test_json = extract_json_from_response(unit_test_content)
+        
+        unit_test_code_raw = unit_test_json.get("unitTestCode", "")
+        unit_test_code = re.sub(r"^```[a-zA-Z]*\s*|\s*```$", "", unit_test_code_raw.strip())
         
-        # Parse the JSON response
-        functional_test_content = functional_test_response.choices[0].message.content.strip()
         try:
             functional_test_json = json.loads(functional_test_content)
         except json.JSONDecodeError:
@@ -623,72 +723,78 @@ def generate_tests():
         return jsonify({"error": "Missing required fields"}), 400
     
     try:
-        # Generate unit test cases
-        unit_test_prompt = create_unit_test_prompt(
+        # The converted code and requirements precede the instructions of both test requests
+        test_context = create_test_context_prompt(
             target_language,
             converted_code,
             business_requirements,
             technical_requirements
         )
+
+        # Generate unit test cases
+        unit_test_prompt = create_unit_test_prompt(target_language)
         
-        unit_test_response = client.chat.completions.create(
-            model=AZURE_OPENAI_DEPLOYMENT_NAME,
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"You are an expert test engineer specializing in writing unit tests for {target_language}. "
-                              f"You create comprehensive unit tests that verify all business logic and edge cases. "
-                              f"Return your response in JSON format with the following structure:\n"
-                              f"{{\n"
-                              f'  "unitTestCode": "The complete unit test code here",\n'
-                              f'  "testCases": [\n'
-                              f'    {{"id": "TC1", "description": "Test case description", "expectedResult": "Expected outcome"}},\n'
-                              f'    {{"id": "TC2", "description": "Another test case", "expectedResult": "Expected outcome"}}\n'
-                              f'  ]\n'
-                              f"}}"
-                },
-                {"role": "user", "content": unit_test_prompt}
-            ],
-            temperature=0.1,
-            max_tokens=3000,
-            response_format={"type": "json_object"}
-        )
+        async def generate_unit_tests(async_client):
+            unit_test_response = await async_client.chat.completions.create(
+                model=AZURE_OPENAI_DEPLOYMENT_NAME,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": f"You are an expert test engineer specializing in writing unit tests for {target_language}. "
+                                  f"You create comprehensive unit tests that verify all business logic and edge cases. "
+                                  f"Return your response in JSON format with the following structure:\n"
+                                  f"{{\n"
+                                  f'  "unitTestCode": "The complete unit test code here",\n'
+                                  f'  "testCases": [\n'
+                                  f'    {{"id": "TC1", "description": "Test case description", "expectedResult": "Expected outcome"}},\n'
+                                  f'    {{"id": "TC2", "description": "Another test case", "expectedResult": "Expected outcome"}}\n'
+                                  f'  ]\n'
+                                  f"}}"
+                    },
+                    {"role": "user", "content": test_context + unit_test_prompt}
+                ],
+                temperature=0.1,
+                max_tokens=3000,
+                response_format={"type": "json_object"}
+            )
+            return unit_test_response.choices[0].message.content.strip()
         
         # Generate functional test cases
-        functional_test_prompt = create_functional_test_prompt(
-            target_language,
-            converted_code,
-            business_requirements
-        )
+        functional_test_prompt = create_functional_test_prompt(target_language)
+        
+        async def generate_functional_tests(async_client):
+            functional_test_response = await async_client.chat.completions.create(
+                model=AZURE_OPENAI_DEPLOYMENT_NAME,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": f"You are an expert QA engineer specializing in creating functional tests for {target_language} applications. "
+                                  f"You create comprehensive test scenarios that verify the application meets all business requirements. "
+                                  f"Focus on user journey tests and acceptance criteria. "
+                                  f"Do not use '#' headings; use numbered steps and bullet points within the JSON. "
+                                  f"Return your response in JSON format with the following structure:\n"
+                                  f"{{\n"
+                                  f'  "functionalTests": [\n'
+                                  f'    {{"id": "FT1", "title": "Test scenario title", "steps": ["Step 1", "Step 2"], "expectedResult": "Expected outcome"}},\n'
+                                  f'    {{"id": "FT2", "title": "Another test scenario", "steps": ["Step 1", "Step 2"], "expectedResult": "Expected outcome"}}\n'
+                                  f'  ]\n'
+                                  f"}}"
+                    },
+                    {"role": "user", "content": test_context + functional_test_prompt}
+                ],
+                temperature=0.1,
+                max_tokens=3000,
+                response_format={"type": "json_object"}
+            )
+            return functional_test_response.choices[0].message.content.strip()
         
-        functional_test_response = client.chat.completions.create(
-            model=AZURE_OPENAI_DEPLOYMENT_NAME,
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"You are an expert QA engineer specializing in creating functional tests for {target_language} applications. "
-                              f"You create comprehensive test scenarios that verify the application meets all business requirements. "
-                              f"Focus on user journey tests and acceptance criteria. "
-                              f"Please Donot respond in # format1 Please genrate in numeric and bullet points format in json"
-                              f"Return your response in JSON format with the following structure:\n"
-                              f"{{\n"
-                              f'  "functionalTests": [\n'
-                              f'    {{"id": "FT1", "title": "Test scenario title", "steps": ["Step 1", "Step 2"], "expectedResult": "Expected outcome"}},\n'
-                              f'    {{"id": "FT2", "title": "Another test scenario", "steps": ["Step 1", "Step 2"], "expectedResult": "Expected outcome"}}\n'
-                              f'  ]\n'
-                              f"}}"
-                },
-                {"role": "user", "content": functional_test_prompt}
-            ],
-            temperature=0.1,
-            max_tokens=3000,
-            response_format={"type": "json_object"}
+        unit_test_content, functional_test_content = run_concurrently(
+            create_async_client,
+            generate_unit_tests,
+            generate_functional_tests
         )
         
         # Parse the JSON responses
-        unit_test_content = unit_test_response.choices[0].message.content.strip()
-        functional_test_content = functional_test_response.choices[0].message.content.strip()
-        
         try:
             unit_test_json = json.loads(unit_test_content)
         except json.JSONDecodeError:
@@ -1,6 +1,9 @@
 import logging
 import re
 import json
+from concurrent.futures import ThreadPoolExecutor
+from string import Template
+from textwrap import dedent
 from typing import List, Dict, Any, Optional
 from langchain_text_splitters import Language, RecursiveCharacterTextSplitter
 
@@ -11,6 +14,330 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Limits for converting all chunks of a program in a single batched request.
+BATCH_MAX_INPUT_TOKENS = 60000
+BATCH_MAX_OUTPUT_TOKENS = 16000
+CHUNK_OUTPUT_TOKENS = 4000
+# Most chunk conversion requests in flight at once when chunks are converted one request each.
+MAX_CONCURRENT_CHUNK_REQUESTS = 4
+
+# Instructions added to single-chunk prompts for COBOL to Java/C# conversion
+_COBOL_CONVERSION_INSTRUCTIONS = dedent("""
+
+    CRITICAL INSTRUCTIONS FOR COBOL TO JAVA/C# CONVERSION:
+
+    1. DATA STRUCTURE MAPPING:
+    - Convert COBOL records (01 level items) to classes
+    - Map COBOL group items (05-49 level) to nested classes or complex properties
+    - Map elementary items (PIC clauses) to appropriate data types:
+        * PIC 9(n) -> int, long, or BigInteger depending on size
+        * PIC 9(n)V9(m) -> double or BigDecimal (use BigDecimal for financial calculations)
+        * PIC X(n) -> String (with proper length)
+        * PIC A(n) -> String (with proper length)
+        * COMP-3 fields -> appropriate numeric type with scaling
+    - Handle REDEFINES with appropriate conversion strategy (e.g., inheritance or multiple properties)
+    - Convert COBOL tables (OCCURS clause) to arrays or Collections
+
+    2. PROCEDURE CONVERSION:
+    - Convert COBOL paragraphs to methods
+    - Convert PERFORM statements to method calls
+    - Replace GOTO statements with structured alternatives (loops, conditionals)
+    - Convert in-line PERFORM with appropriate loop structure
+    - Handle COBOL specific control flow (EVALUATE, etc.)
+
+    3. FILE HANDLING CONVERSION:
+    - Convert COBOL file operations (OPEN, READ, WRITE) to appropriate Java/C# I/O
+    - For indexed files, use appropriate database or file-based index solution
+    - For sequential files, use appropriate stream-based I/O
+    - Handle record locking mechanisms appropriately
+
+    4. ERROR HANDLING:
+    - Convert COBOL ON SIZE ERROR to appropriate exception handling
+    - Convert FILE STATUS checks to try-catch blocks
+    - Implement appropriate logging and error reporting
+
+    5. NUMERIC PROCESSING:
+    - Preserve exact decimal calculations where needed (BigDecimal in Java, decimal in C#)
+    - Handle implicit decimal points from COBOL PIC clauses
+    - Preserve COBOL numeric editing behavior when formatting output
+
+    6. COMPLETENESS AND STRUCTURE:
+    - Ensure all variables are properly initialized
+    - Add appropriate constructors to classes
+    - Implement appropriate access modifiers (public, private, etc.)
+    - Add appropriate getters and setters for class properties
+    - Add appropriate package/namespace organization
+    """)
+
+# Instructions added to single-chunk prompts for any conversion to Java/C#
+_CLEAN_CODE_INSTRUCTIONS = dedent("""
+
+    CRITICAL INSTRUCTIONS FOR CLEAN CODE GENERATION:
+
+    1. COMPLETE ALL CODE BLOCKS - Never leave any block incomplete
+    - Every opening brace must have a closing brace
+    - Every if/for/while must have a complete body
+    - Every try must have catch and finally blocks
+    - Every method must have a return type and complete implementation
+
+    2. EXCEPTION HANDLING - Implement proper exception handling
+    - All catch blocks must have actual code handling the exception
+    - Don't leave catch blocks empty or with placeholder comments
+    - Use try-with-resources where appropriate
+    - Add specific exception types when possible
+
+    3. DATABASE CODE - Ensure proper connection management
+    - Always close connections, statements, and result sets in finally blocks
+    - Use try-with-resources for database resources
+    - Implement proper transaction management
+
+    4. METHOD SIGNATURES - Use complete and proper method signatures
+    - Include all method modifiers (public/private/static/etc.)
+    - Specify return types for all methods
+    - Include parameter types for all parameters
+    - Add throws declarations when needed
+
+    5. CLASS STRUCTURE - Make sure classes are properly formatted
+    - Include all necessary imports at the top
+    - Declare all fields with proper access modifiers
+    - Include necessary constructors
+    - Implement interfaces and extend classes as needed
+
+    6. AVOID DUPLICATIONS - Avoid duplicating code unnecessarily
+
+    7. COMPLETENESS - Make sure the generated code is complete and runnable
+    - No undefined variables or methods
+    - No placeholder comments where code should be
+    """)
+
+# Target language instructions for the code structure prompt
+_STRUCTURE_LANGUAGE_INSTRUCTIONS = {
+    "Java": dedent("""
+        For Java output, please include:
+
+        1. PROPER PACKAGE STRUCTURE - Organize code with appropriate packages
+        - Identify logical components and group related classes
+        - Use standard Java package naming conventions (e.g., com.company.module)
+
+        2. CLASS HIERARCHY - Design an object-oriented structure
+        - Define appropriate class hierarchies with inheritance
+        - Use interfaces for common behavior
+        - Apply design patterns where appropriate
+
+        3. ACCESS MODIFIERS - Apply correct encapsulation
+        - Use private for fields with getters/setters
+        - Protect internal implementation details
+        - Expose only necessary public methods
+
+        4. FIELD DEFINITIONS - Proper variable declarations
+        - Include appropriate data types for all fields
+        - Apply final modifier where variables shouldn't change
+        - Initialize all fields with appropriate defaults
+
+        5. EXCEPTION HANDLING - Use Java exception hierarchy
+        - Define application-specific exceptions if needed
+        - Use checked exceptions for recoverable conditions
+        - Use unchecked exceptions for programming errors
+
+        6. JAVA CONVENTIONS - Follow standard Java practices
+        - Use camelCase for variables and methods
+        - Use PascalCase for class names
+        - Use ALL_CAPS for constants
+        """),
+    "C#": dedent("""
+        For C# output, please include:
+
+        1. NAMESPACE STRUCTURE - Organize code with appropriate namespaces
+        - Identify logical components and group related classes
+        - Use standard C# namespace conventions (e.g., Company.Module)
+
+        2. CLASS HIERARCHY - Design an object-oriented structure
+        - Define appropriate class hierarchies with inheritance
+        - Use interfaces for common behavior
+        - Apply design patterns where appropriate
+
+        3. ACCESS MODIFIERS - Apply correct encapsulation
+        - Use private for fields with properties
+        - Protect internal implementation details
+        - Expose only necessary public methods
+
+        4. FIELD DEFINITIONS - Proper variable declarations
+        - Include appropriate data types for all fields
+        - Use properties with getters/setters
+        - Initialize all fields with appropriate defaults
+
+        5. EXCEPTION HANDLING - Use .NET exception hierarchy
+        - Define application-specific exceptions if needed
+        - Use try-catch-finally blocks consistently
+        - Include appropriate exception handling strategies
+
+        6. C# CONVENTIONS - Follow standard C# practices
+        - Use camelCase for private fields (with _ prefix)
+        - Use PascalCase for properties, methods, and class names
+        - Use PascalCase for public fields (rarely used)
+        """),
+}
+
+# Additional code structure instructions for COBOL source code
+_STRUCTURE_COBOL_INSTRUCTIONS = dedent("""
+    For COBOL to Java/C# migration, please also provide:
+
+    1. DATA DIVISION mapping - Map all COBOL records/structures to appropriate classes
+    - Identify all WORKING-STORAGE SECTION items and how they should be represented
+    - Map FILE SECTION records to appropriate data models
+    - Determine which COBOL fields should become class fields vs. local variables
+    - Handle COBOL PICTURE clauses with appropriate data types and precision
+    - Handle REDEFINES with appropriate object patterns (e.g., inheritance, interfaces)
+
+    2. PROCEDURE DIVISION mapping - Map all COBOL paragraphs/sections to methods
+    - Identify main program flow and control structures
+    - Map PERFORM statements to appropriate method calls 
+    - Create structured methods with single responsibility
+    - Determine how to handle GOTO statements and eliminate spaghetti code
+    - Convert COBOL-style control flow to modern OO structured programming
+
+    3. Database integration - Identify any database or file access
+    - Map COBOL file operations to JDBC/ADO.NET
+    - Convert COBOL file I/O to appropriate database operations
+    - Handle indexed files with proper key management 
+    - Convert any embedded SQL to prepared statements and proper connection handling
+
+    4. Error handling - Map COBOL error handling to exception-based approach
+    - Convert status code checks to try-catch blocks
+    - Identify ON ERROR and similar constructs
+    - Create appropriate custom exception classes when needed
+    - Implement proper resource cleanup in finally blocks
+
+    5. Numeric/decimal handling - Identify precision requirements
+    - Use BigDecimal/decimal for financial calculations
+    - Handle implicit decimal points properly (PIC 9(7)V99)
+    - Apply proper rounding modes where needed
+    - Ensure numeric formatting follows business requirements
+
+    6. MODULE ORGANIZATION - Properly organize the application
+    - Separate business logic from data access
+    - Create service layers for main functionality
+    - Implement proper dependency management
+    - Follow modern OO design principles (SOLID)
+    """)
+
+_STRUCTURE_PROMPT_TMPL = Template(dedent("""
+    I need to convert ${source_language} code to ${target_language}, but first I need a detailed high-level structure to ensure consistency, quality and maintainability.
+
+    Please analyze this code and provide a DETAILED architectural blueprint including:
+
+    1. COMPLETE CLASS STRUCTURE with:
+    - All necessary classes, interfaces, and enums
+    - Clear inheritance hierarchies and relationships
+    - Fields with their types and access modifiers
+    - Complete method signatures (return types, parameters, exceptions)
+
+    2. PACKAGE/NAMESPACE ORGANIZATION:
+    - Logical grouping of related classes
+    - Proper naming following ${target_language} conventions
+
+    3. DATABASE ACCESS (if present):
+    - Connection management approach
+    - Transaction handling
+    - Resource cleanup strategy
+
+    4. DESIGN PATTERNS to implement:
+    - Identify appropriate patterns for clean code structure
+    - How to eliminate procedural code and make it object-oriented
+
+    5. ERROR HANDLING STRATEGY:
+    - Exception hierarchy
+    - Resource cleanup approach
+    - Logging strategy
+
+    ${language_specific}
+
+    ${cobol_specific}
+
+    DO NOT convert the code in detail yet. Provide ONLY a comprehensive structural blueprint focusing on architecture, relationships, and ensuring clean, maintainable code that follows all ${target_language} best practices.
+
+    Here's the ${source_language} code to analyze:
+
+    ```
+    ${complete_code}
+    ```
+    """))
+
+_COBOL_DIVISION_PATTERN = re.compile(r"\b(IDENTIFICATION|ID|ENVIRONMENT|DATA|PROCEDURE)\s+DIVISION\b", re.IGNORECASE)
+
+
+def _framework_info(target_language: str) -> str:
+    """Describes the framework a conversion to the target language is built on"""
+    if target_language.lower() == "java":
+        return "Spring Boot framework"
+    if target_language.lower() in ["c#", "csharp"]:
+        return ".NET Core/ASP.NET Core framework"
+    return f"{target_language} best practices"
+
+
+def _conversion_instructions(source_language: str, target_language: str) -> List[str]:
+    """
+    Instructions added after the conversion prompt of each chunk, whether the chunks
+    are converted one request each or in a single batched request.
+    
+    Args:
+        source_language: Source programming language
+        target_language: Target programming language
+        
+    Returns:
+        List of instruction sections
+    """
+    from prompts import create_db_usage_reminder
+    
+    instructions = []
+    # Add COBOL-specific instructions for Java/C# conversion
+    if source_language == "COBOL" and target_language in ["Java", "C#"]:
+        instructions.append(_COBOL_CONVERSION_INSTRUCTIONS)
+    
+    # Enhanced instructions for Java/C# conversion
+    if target_language in ["Java", "C#"]:
+        instructions.append(_CLEAN_CODE_INSTRUCTIONS)
+    
+    # Add special instruction about database code
+    instructions.append(create_db_usage_reminder(source_language, target_language))
+    return instructions
+
+
+def classify_chunks(chunks: List[str], source_language: str) -> List[str]:
+    """
+    Determine the chunk type of each chunk of a program. COBOL chunks holding only the
+    divisions before the PROCEDURE DIVISION are 'declarations', chunks entirely within
+    it are 'procedures', and all other chunks are 'mixed'.
+    
+    Args:
+        chunks: The code chunks, in program order
+        source_language: Source programming language
+        
+    Returns:
+        The chunk type of each chunk
+    """
+    if source_language.upper() != "COBOL":
+        return ["mixed"] * len(chunks)
+    
+    chunk_types = []
+    in_procedures = False
+    for chunk in chunks:
+        headers = list(_COBOL_DIVISION_PATTERN.finditer(chunk))
+        # A chunk covers the division it starts in, unless it starts with a division header
+        covered = {in_procedures} if not headers or chunk[:headers[0].start()].strip() else set()
+        covered.update(header.group(1).upper() == "PROCEDURE" for header in headers)
+        if headers:
+            in_procedures = headers[-1].group(1).upper() == "PROCEDURE"
+        
+        if covered == {True}:
+            chunk_types.append("procedures")
+        elif covered == {False}:
+            chunk_types.append("declarations")
+        else:
+            chunk_types.append("mixed")
+    return chunk_types
+
+
 class CodeConverter:
     """
     A class to handle code conversion process, including code chunking and 
@@ -131,14 +458,18 @@ class CodeConverter:
         structure_prompt = self._create_structure_prompt(chunks, source_language, target_language)
         structure_result = self._get_code_structure(structure_prompt, target_language)
         
-        # Phase 2: Convert each chunk with awareness of the overall structure
-        conversion_results = []
-        for i, chunk in enumerate(chunks):
-            logger.info(f"Converting chunk {i+1}/{len(chunks)}")
-            
-            # Enhanced context includes the code structure and chunk position
-            chunk_context = f"""
-            This is chunk {i+1} of {len(chunks)} from the complete source code.
+        # Phase 2: Convert all chunks in a single request when they fit the model limits
+        batch_results = self._convert_chunks_batch(
+            chunks, source_language, target_language, vsam_definition,
+            business_requirements, technical_requirements, db_setup_template, structure_result
+        )
+        if batch_results is not None:
+            return self._merge_conversion_results(batch_results, target_language, structure_result)
+        
+        # Otherwise convert each chunk with awareness of the overall structure
+        total_chunks = len(chunks)
+        # The structure guidance is the same for every chunk, so it is built once
+        structure_context = f"""
             
             IMPORTANT: Ensure your conversion aligns with this overall code structure:
             {structure_result.get('structure', 'No structure available')}
@@ -157,19 +488,132 @@ class CodeConverter:
             - Handle exception blocks properly - don't leave them empty
             - Complete any missing control flow statements (if/while/try)
             """
+
+        def convert_chunk(numbered_chunk):
+            chunk_number, chunk = numbered_chunk
+            logger.info(f"Converting chunk {chunk_number}/{total_chunks}")
+            
+            # Enhanced context includes the code structure and chunk position
+            chunk_context = f"""
+            This is chunk {chunk_number} of {total_chunks} from the complete source code.""" + structure_context
             
-            result = self._convert_single_chunk(
+            return self._convert_single_chunk(
                 chunk, source_language, target_language, vsam_definition,
                 business_requirements, technical_requirements, 
                 db_setup_template, additional_context=chunk_context
             )
-            
-            conversion_results.append(result)
+        
+        # Chunks do not depend on each other's results, so their requests overlap; map keeps chunk order
+        with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENT_CHUNK_REQUESTS, total_chunks))) as executor:
+            conversion_results = list(executor.map(convert_chunk, enumerate(chunks, start=1)))
         
         # Use the structure-aware merge to create the final code
         return self._merge_conversion_results(conversion_results, target_language, structure_result)
     
 
+    def _convert_chunks_batch(self, chunks: List[str], source_language: str, target_language: str,
+                              vsam_definition: str, business_requirements: str, technical_requirements: str,
+                              db_setup_template: str, structure_result: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Convert all chunks with a single batched request instead of one request per chunk.
+        
+        Args:
+            chunks: List of code chunks to convert
+            source_language: Source programming language
+            target_language: Target programming language for conversion
+            vsam_definition: Optional VSAM file definition
+            business_requirements: Business requirements to consider during conversion
+            technical_requirements: Technical requirements to consider during conversion
+            db_setup_template: Database setup template if needed
+            structure_result: Overall code structure from the first phase
+            
+        Returns:
+            List of conversion results per chunk, or None if the chunks should be converted individually
+        """
+        from prompts import ChunkSpec, count_tokens, create_code_conversion_prompt_batch, iter_batch_conversion_outputs
+        from llm_dispatch import stream_completion
+        from db_usage import detect_database_usage
+        
+        chunk_types = classify_chunks(chunks, source_language)
+        prompt = "".join([
+            create_code_conversion_prompt_batch(
+                source_language=source_language,
+                target_language=target_language,
+                chunks=[ChunkSpec(chunk, chunk_type) for chunk, chunk_type in zip(chunks, chunk_types)],
+                business_requirements=business_requirements,
+                technical_requirements=technical_requirements,
+                db_setup_template=db_setup_template,
+                vsam_definition=vsam_definition
+            ),
+            *_conversion_instructions(source_language, target_language),
+            f"""
+            
+            IMPORTANT: Ensure your conversion aligns with this overall code structure:
+            {structure_result.get('structure', 'No structure available')}
+            """
+        ])
+        
+        # Fall back to per-chunk conversion if the combined request would not fit the model limits
+        input_tokens = count_tokens(prompt)
+        output_tokens = CHUNK_OUTPUT_TOKENS * len(chunks)
+        if input_tokens > BATCH_MAX_INPUT_TOKENS or output_tokens > BATCH_MAX_OUTPUT_TOKENS:
+            logger.info(f"Batched prompt too large ({input_tokens} input tokens, {output_tokens} output tokens). "
+                        f"Converting chunks individually.")
+            return None
+        
+        logger.info(f"Converting {len(chunks)} chunks in a single batched request")
+        results = {}
+        finish_reasons = []
+        try:
+            # Stream the response so each chunk is picked up as soon as the model finishes it
+            response_stream = stream_completion(
+                self.client,
+                on_finish=finish_reasons.append,
+                model=self.model_name,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": f"You are an expert code converter specializing in {source_language} to {target_language} migration "
+                                f"using {_framework_info(target_language)}. "
+                                f"You convert legacy code to modern, idiomatic code while maintaining all business logic. "
+                                f"Your code must be complete, well-structured, and follow best practices. "
+                                f"Return the converted code for every chunk, each preceded by its ##CHUNK n OUTPUT line."
+                    },
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.1,
+                max_tokens=output_tokens
+            )
+            for chunk_number, code in iter_batch_conversion_outputs(response_stream):
+                logger.info(f"Received converted chunk {chunk_number}/{len(chunks)}")
+                results[chunk_number] = {
+                    "convertedCode": code,
+                    "conversionNotes": "",
+                    "potentialIssues": [],
+                    # The batched response is plain code, so database use is detected from the chunk source
+                    "databaseUsed": detect_database_usage(chunks[chunk_number - 1], source_language)
+                }
+        except Exception as e:
+            logger.error(f"Error in batched chunk conversion: {str(e)}")
+            return None
+        
+        # A response cut off at max_tokens can still hold every marker, with the last chunk truncated
+        if "length" in finish_reasons:
+            logger.warning("Batched response hit the output token limit. Converting chunks individually.")
+            return None
+        
+        if sorted(results) != list(range(1, len(chunks) + 1)):
+            logger.warning("Batched response is missing chunk outputs. Converting chunks individually.")
+            return None
+        
+        # Validate the converted code as the per-chunk conversion does
+        if target_language in ["Java", "C#"]:
+            for result in results.values():
+                self._validate_code(result, target_language)
+        
+        return [results[chunk_number] for chunk_number in range(1, len(chunks) + 1)]
+    
+
 
     def _create_structure_prompt(self, chunks: List[str], source_language: str, target_language: str) -> str:
         """
@@ -198,161 +642,13 @@ class CodeConverter:
             
             complete_code = f"{begin}\n\n... [code truncated for brevity] ...\n\n{middle}\n\n... [code truncated for brevity] ...\n\n{end}"
         
-        # Target language specific instructions
-        language_specific = ""
-        if target_language == "Java":
-            language_specific = """
-            For Java output, please include:
-            
-            1. PROPER PACKAGE STRUCTURE - Organize code with appropriate packages
-            - Identify logical components and group related classes
-            - Use standard Java package naming conventions (e.g., com.company.module)
-            
-            2. CLASS HIERARCHY - Design an object-oriented structure
-            - Define appropriate class hierarchies with inheritance
-            - Use interfaces for common behavior
-            - Apply design patterns where appropriate
-            
-            3. ACCESS MODIFIERS - Apply correct encapsulation
-            - Use private for fields with getters/setters
-            - Protect internal implementation details
-            - Expose only necessary public methods
-            
-            4. FIELD DEFINITIONS - Proper variable declarations
-            - Include appropriate data types for all fields
-            - Apply final modifier where variables shouldn't change
-            - Initialize all fields with appropriate defaults
-            
-            5. EXCEPTION HANDLING - Use Java exception hierarchy
-            - Define application-specific exceptions if needed
-            - Use checked exceptions for recoverable conditions
-            - Use unchecked exceptions for programming errors
-            
-            6. JAVA CONVENTIONS - Follow standard Java practices
-            - Use camelCase for variables and methods
-            - Use PascalCase for class names
-            - Use ALL_CAPS for constants
-            """
-        elif target_language == "C#":
-            language_specific = """
-            For C# output, please include:
-            
-            1. NAMESPACE STRUCTURE - Organize code with appropriate namespaces
-            - Identify logical components and group related classes
-            - Use standard C# namespace conventions (e.g., Company.Module)
-            
-            2. CLASS HIERARCHY - Design an object-oriented structure
-            - Define appropriate class hierarchies with inheritance
-            - Use interfaces for common behavior
-            - Apply design patterns where appropriate
-            
-            3. ACCESS MODIFIERS - Apply correct encapsulation
-            - Use private for fields with properties
-            - Protect internal implementation details
-            - Expose only necessary public methods
-            
-            4. FIELD DEFINITIONS - Proper variable declarations
-            - Include appropriate data types for all fields
-            - Use properties with getters/setters
-            - Initialize all fields with appropriate defaults
-            
-            5. EXCEPTION HANDLING - Use .NET exception hierarchy
-            - Define application-specific exceptions if needed
-            - Use try-catch-finally blocks consistently
-            - Include appropriate exception handling strategies
-            
-            6. C# CONVENTIONS - Follow standard C# practices
-            - Use camelCase for private fields (with _ prefix)
-            - Use PascalCase for properties, methods, and class names
-            - Use PascalCase for public fields (rarely used)
-            """
-        
-        # COBOL-specific instructions for structure analysis
-        cobol_specific = ""
-        if source_language == "COBOL":
-            cobol_specific = """
-            For COBOL to Java/C# migration, please also provide:
-            
-            1. DATA DIVISION mapping - Map all COBOL records/structures to appropriate classes
-            - Identify all WORKING-STORAGE SECTION items and how they should be represented
-            - Map FILE SECTION records to appropriate data models
-            - Determine which COBOL fields should become class fields vs. local variables
-            - Handle COBOL PICTURE clauses with appropriate data types and precision
-            - Handle REDEFINES with appropriate object patterns (e.g., inheritance, interfaces)
-            
-            2. PROCEDURE DIVISION mapping - Map all COBOL paragraphs/sections to methods
-            - Identify main program flow and control structures
-            - Map PERFORM statements to appropriate method calls 
-            - Create structured methods with single responsibility
-            - Determine how to handle GOTO statements and eliminate spaghetti code
-            - Convert COBOL-style control flow to modern OO structured programming
-            
-            3. Database integration - Identify any database or file access
-            - Map COBOL file operations to JDBC/ADO.NET
-            - Convert COBOL file I/O to appropriate database operations
-            - Handle indexed files with proper key management 
-            - Convert any embedded SQL to prepared statements and proper connection handling
-            
-            4. Error handling - Map COBOL error handling to exception-based approach
-            - Convert status code checks to try-catch blocks
-            - Identify ON ERROR and similar constructs
-            - Create appropriate custom exception classes when needed
-            - Implement proper resource cleanup in finally blocks
-            
-            5. Numeric/decimal handling - Identify precision requirements
-            - Use BigDecimal/decimal for financial calculations
-            - Handle implicit decimal points properly (PIC 9(7)V99)
-            - Apply proper rounding modes where needed
-            - Ensure numeric formatting follows business requirements
-            
-            6. MODULE ORGANIZATION - Properly organize the application
-            - Separate business logic from data access
-            - Create service layers for main functionality
-            - Implement proper dependency management
-            - Follow modern OO design principles (SOLID)
-            """
-        
-        return f"""
-        I need to convert {source_language} code to {target_language}, but first I need a detailed high-level structure to ensure consistency, quality and maintainability.
-        
-        Please analyze this code and provide a DETAILED architectural blueprint including:
-        
-        1. COMPLETE CLASS STRUCTURE with:
-        - All necessary classes, interfaces, and enums
-        - Clear inheritance hierarchies and relationships
-        - Fields with their types and access modifiers
-        - Complete method signatures (return types, parameters, exceptions)
-        
-        2. PACKAGE/NAMESPACE ORGANIZATION:
-        - Logical grouping of related classes
-        - Proper naming following {target_language} conventions
-        
-        3. DATABASE ACCESS (if present):
-        - Connection management approach
-        - Transaction handling
-        - Resource cleanup strategy
-        
-        4. DESIGN PATTERNS to implement:
-        - Identify appropriate patterns for clean code structure
-        - How to eliminate procedural code and make it object-oriented
-        
-        5. ERROR HANDLING STRATEGY:
-        - Exception hierarchy
-        - Resource cleanup approach
-        - Logging strategy
-        
-        {language_specific}
-        
-        {cobol_specific}
-        
-        DO NOT convert the code in detail yet. Provide ONLY a comprehensive structural blueprint focusing on architecture, relationships, and ensuring clean, maintainable code that follows all {target_language} best practices.
-        
-        Here's the {source_language} code to analyze:
-        
-        ```
-        {complete_code}
-        ```
-        """
+        return _STRUCTURE_PROMPT_TMPL.substitute(
+            source_language=source_language,
+            target_language=target_language,
+            language_specific=_STRUCTURE_LANGUAGE_INSTRUCTIONS.get(target_language, ""),
+            cobol_specific=_STRUCTURE_COBOL_INSTRUCTIONS if source_language == "COBOL" else "",
+            complete_code=complete_code
+        )
 
     
 
@@ -463,245 +759,153 @@ class CodeConverter:
                 "patterns": []
             }
     
-def _convert_single_chunk(self, code_chunk: str, source_language: str,
-                         target_language: str,vsam_definition: str, business_requirements: str,
-                         technical_requirements: str, db_setup_template: str,
-                         additional_context: str = "") -> Dict[str, Any]:
-    """
-    Convert a single code chunk with enhanced COBOL-specific instructions.
-    
-    Args:
-        code_chunk: The code chunk to convert
-        source_language: Source programming language
-        target_language: Target programming language
-        business_requirements: Business requirements
-        technical_requirements: Technical requirements
-        db_setup_template: Database setup template
-        additional_context: Additional context for the model
-        
-    Returns:
-        Dictionary with conversion results
-    """
-    
-    # Create appropriate prompt based on target language
-    if target_language.lower() == "java":
-        # Import the Java-specific prompt function
-        from java_code_converter import create_java_code_conversion_prompt
-        prompt = create_java_code_conversion_prompt(
-            source_language=source_language,
-            source_code=code_chunk,
-            business_requirements=business_requirements,
-            technical_requirements=technical_requirements,
-            db_setup_template=db_setup_template,
-            vsam_definition=vsam_definition
-        )
-        framework_info = "Spring Boot framework"
-        
-    elif target_language.lower() in ["c#", "csharp"]:
-        # Import the C#-specific prompt function
-        from csharp_code_converter import create_csharp_code_conversion_prompt
-        prompt = create_csharp_code_conversion_prompt(
-            source_language=source_language,
-            source_code=code_chunk,
-            business_requirements=business_requirements,
-            technical_requirements=technical_requirements,
-            db_setup_template=db_setup_template,
-            vsam_definition=vsam_definition
-        )
-        framework_info = ".NET Core/ASP.NET Core framework"
-        
-    else:
-        # Fallback to generic conversion for other languages
-        from prompts import create_code_conversion_prompt
-        
-        prompt = create_code_conversion_prompt(
-            source_language,
-            target_language,
-            code_chunk,
-            business_requirements,
-            vsam_definition,
-            technical_requirements,
-            db_setup_template
-        )
-        framework_info = f"{target_language} best practices"
-    
-    # Add COBOL-specific instructions for Java/C# conversion
-    if source_language == "COBOL" and target_language in ["Java", "C#"]:
-        prompt += """
-        
-        CRITICAL INSTRUCTIONS FOR COBOL TO JAVA/C# CONVERSION:
-        
-        1. DATA STRUCTURE MAPPING:
-        - Convert COBOL records (01 level items) to classes
-        - Map COBOL group items (05-49 level) to nested classes or complex properties
-        - Map elementary items (PIC clauses) to appropriate data types:
-            * PIC 9(n) -> int, long, or BigInteger depending on size
-            * PIC 9(n)V9(m) -> double or BigDecimal (use BigDecimal for financial calculations)
-            * PIC X(n) -> String (with proper length)
-            * PIC A(n) -> String (with proper length)
-            * COMP-3 fields -> appropriate numeric type with scaling
-        - Handle REDEFINES with appropriate conversion strategy (e.g., inheritance or multiple properties)
-        - Convert COBOL tables (OCCURS clause) to arrays or Collections
-        
-        2. PROCEDURE CONVERSION:
-        - Convert COBOL paragraphs to methods
-        - Convert PERFORM statements to method calls
-        - Replace GOTO statements with structured alternatives (loops, conditionals)
-        - Convert in-line PERFORM with appropriate loop structure
-        - Handle COBOL specific control flow (EVALUATE, etc.)
-        
-        3. FILE HANDLING CONVERSION:
-        - Convert COBOL file operations (OPEN, READ, WRITE) to appropriate Java/C# I/O
-        - For indexed files, use appropriate database or file-based index solution
-        - For sequential files, use appropriate stream-based I/O
-        - Handle record locking mechanisms appropriately
-        
-        4. ERROR HANDLING:
-        - Convert COBOL ON SIZE ERROR to appropriate exception handling
-        - Convert FILE STATUS checks to try-catch blocks
-        - Implement appropriate logging and error reporting
-        
-        5. NUMERIC PROCESSING:
-        - Preserve exact decimal calculations where needed (BigDecimal in Java, decimal in C#)
-        - Handle implicit decimal points from COBOL PIC clauses
-        - Preserve COBOL numeric editing behavior when formatting output
-        
-        6. COMPLETENESS AND STRUCTURE:
-        - Ensure all variables are properly initialized
-        - Add appropriate constructors to classes
-        - Implement appropriate access modifiers (public, private, etc.)
-        - Add appropriate getters and setters for class properties
-        - Add appropriate package/namespace organization
+    def _convert_single_chunk(self, code_chunk: str, source_language: str,
+                             target_language: str,vsam_definition: str, business_requirements: str,
+                             technical_requirements: str, db_setup_template: str,
+                             additional_context: str = "") -> Dict[str, Any]:
         """
-    
-    # Enhanced instructions for Java/C# conversion
-    if target_language in ["Java", "C#"]:
-        prompt += """
-        
-        CRITICAL INSTRUCTIONS FOR CLEAN CODE GENERATION:
-        
-        1. COMPLETE ALL CODE BLOCKS - Never leave any block incomplete
-        - Every opening brace must have a closing brace
-        - Every if/for/while must have a complete body
-        - Every try must have catch and finally blocks
-        - Every method must have a return type and complete implementation
-        
-        2. EXCEPTION HANDLING - Implement proper exception handling
-        - All catch blocks must have actual code handling the exception
-        - Don't leave catch blocks empty or with placeholder comments
-        - Use try-with-resources where appropriate
-        - Add specific exception types when possible
-        
-        3. DATABASE CODE - Ensure proper connection management
-        - Always close connections, statements, and result sets in finally blocks
-        - Use try-with-resources for database resources
-        - Implement proper transaction management
-        
-        4. METHOD SIGNATURES - Use complete and proper method signatures
-        - Include all method modifiers (public/private/static/etc.)
-        - Specify return types for all methods
-        - Include parameter types for all parameters
-        - Add throws declarations when needed
-        
-        5. CLASS STRUCTURE - Make sure classes are properly formatted
-        - Include all necessary imports at the top
-        - Declare all fields with proper access modifiers
-        - Include necessary constructors
-        - Implement interfaces and extend classes as needed
-        
-        6. AVOID DUPLICATIONS - Avoid duplicating code unnecessarily
-        
-        7. COMPLETENESS - Make sure the generated code is complete and runnable
-        - No undefined variables or methods
-        - No placeholder comments where code should be
+        Convert a single code chunk with enhanced COBOL-specific instructions.
+
+        Args:
+            code_chunk: The code chunk to convert
+            source_language: Source programming language
+            target_language: Target programming language
+            business_requirements: Business requirements
+            technical_requirements: Technical requirements
+            db_setup_template: Database setup template
+            additional_context: Additional context for the model
+
+        Returns:
+            Dictionary with conversion results
         """
-    
-    # Add special instruction about database code
-    prompt += f"\n\nIMPORTANT: Only include database initialization code if the source {source_language} code contains database or SQL operations. If the code is a simple algorithm (like sorting, calculation, etc.) without any database interaction, do NOT include any database setup code in the converted {target_language} code."
-    
-    # Add chunk-specific context if provided
-    if additional_context:
-        prompt += f"\n\n{additional_context}"
-    
 
-    try:
-        response = self.client.chat.completions.create(
-            model=self.model_name,
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"You are an expert code converter specializing in {source_language} to {target_language} migration using {framework_info}. "
-                            f"You convert legacy code to modern, idiomatic code while maintaining all business logic. "
-                            f"Your code must be complete, well-structured, and follow best practices. "
-                            f"Ensure that all syntax is correct, with matching brackets and proper statement terminations. "
-                            f"Only include database setup/initialization if the original code uses databases or SQL. "
-                            f"For simple algorithms or calculations without database operations, don't add any database code. "
-                            f"Return your response in JSON format always with the following structure:\n"
-                            f"{{\n"
-                            f'  \"convertedCode\": \"The complete converted code here\",\n'
-                            f'  \"conversionNotes\": \"Notes about the conversion process\",\n'
-                            f'  \"potentialIssues\": [\"List of any potential issues or limitations\"],\n'
-                            f'  \"databaseUsed\": true/false\n'
-                            f"}}"
-                },
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.1,
-            max_tokens=4000,
-            response_format={"type": "json_object"}
+        from prompts import (
+            create_code_conversion_prompt,
+            create_csharp_code_conversion_prompt,
+            create_java_code_conversion_prompt
         )
-        
-        # Parse the JSON response
-        conversion_content = response.choices[0].message.content.strip()
-        
+
+        # Create appropriate prompt based on target language
+        if target_language.lower() == "java":
+            prompt = create_java_code_conversion_prompt(
+                source_language=source_language,
+                source_code=code_chunk,
+                business_requirements=business_requirements,
+                technical_requirements=technical_requirements,
+                db_setup_template=db_setup_template,
+                vsam_definition=vsam_definition
+            )
+
+        elif target_language.lower() in ["c#", "csharp"]:
+            prompt = create_csharp_code_conversion_prompt(
+                source_language=source_language,
+                source_code=code_chunk,
+                business_requirements=business_requirements,
+                technical_requirements=technical_requirements,
+                db_setup_template=db_setup_template,
+                vsam_definition=vsam_definition
+            )
+
+        else:
+            # Fallback to generic conversion for other languages
+            prompt = create_code_conversion_prompt(
+                source_language=source_language,
+                target_language=target_language,
+                source_code=code_chunk,
+                business_requirements=business_requirements,
+                technical_requirements=technical_requirements,
+                db_setup_template=db_setup_template,
+                vsam_definition=vsam_definition
+            )
+
+        parts = [prompt]
+        parts.extend(_conversion_instructions(source_language, target_language))
+
+        # Add chunk-specific context if provided
+        if additional_context:
+            parts.append(f"\n\n{additional_context}")
+
+        prompt = "".join(parts)
+
+
         try:
-            # Attempt to parse the JSON response
-            conversion_json = json.loads(conversion_content)
-            
-            # Validate the converted code
-            if target_language in ["Java", "C#"]:
-                self._validate_code(conversion_json, target_language)
-                
-            return conversion_json
-            
-        except json.JSONDecodeError as json_err:
-            logger.error(f"Error parsing JSON response: {str(json_err)}")
-            logger.debug(f"Problematic response content: {conversion_content}")
-            
-            # Attempt to extract JSON from the response
+            response = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": f"You are an expert code converter specializing in {source_language} to {target_language} migration using {_framework_info(target_language)}. "
+                                f"You convert legacy code to modern, idiomatic code while maintaining all business logic. "
+                                f"Your code must be complete, well-structured, and follow best practices. "
+                                f"Ensure that all syntax is correct, with matching brackets and proper statement terminations. "
+                                f"Only include database setup/initialization if the original code uses databases or SQL. "
+                                f"For simple algorithms or calculations without database operations, don't add any database code. "
+                                f"Return your response in JSON format always with the following structure:\n"
+                                f"{{\n"
+                                f'  \"convertedCode\": \"The complete converted code here\",\n'
+                                f'  \"conversionNotes\": \"Notes about the conversion process\",\n'
+                                f'  \"potentialIssues\": [\"List of any potential issues or limitations\"],\n'
+                                f'  \"databaseUsed\": true/false\n'
+                                f"}}"
+                    },
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.1,
+                max_tokens=4000,
+                response_format={"type": "json_object"}
+            )
+
+            # Parse the JSON response
+            conversion_content = response.choices[0].message.content.strip()
+
             try:
-                # Use regex to find JSON-like content
-                json_pattern = r'(\{[\s\S]*\})'
-                match = re.search(json_pattern, conversion_content)
-                if match:
-                    potential_json = match.group(1)
-                    conversion_json = json.loads(potential_json)
-                    logger.info("Successfully extracted JSON from response using regex")
-                    
-                    # Validate the converted code
-                    if target_language in ["Java", "C#"]:
-                        self._validate_code(conversion_json, target_language)
-                        
-                    return conversion_json
-            except Exception as extract_err:
-                logger.error(f"Failed to extract JSON using regex: {str(extract_err)}")
-            
-            # Return a fallback response
+                # Attempt to parse the JSON response
+                conversion_json = json.loads(conversion_content)
+
+                # Validate the converted code
+                if target_language in ["Java", "C#"]:
+                    self._validate_code(conversion_json, target_language)
+
+                return conversion_json
+
+            except json.JSONDecodeError as json_err:
+                logger.error(f"Error parsing JSON response: {str(json_err)}")
+                logger.debug(f"Problematic response content: {conversion_content}")
+
+                # Attempt to extract JSON from the response
+                try:
+                    # Use regex to find JSON-like content
+                    json_pattern = r'(\{[\s\S]*\})'
+                    match = re.search(json_pattern, conversion_content)
+                    if match:
+                        potential_json = match.group(1)
+                        conversion_json = json.loads(potential_json)
+                        logger.info("Successfully extracted JSON from response using regex")
+
+                        # Validate the converted code
+                        if target_language in ["Java", "C#"]:
+                            self._validate_code(conversion_json, target_language)
+
+                        return conversion_json
+                except Exception as extract_err:
+                    logger.error(f"Failed to extract JSON using regex: {str(extract_err)}")
+
+                # Return a fallback response
+                return {
+                    "convertedCode": "// Error: Invalid response format received from server",
+                    "conversionNotes": f"Error processing response: {str(json_err)}",
+                    "potentialIssues": ["Failed to process model response", "Response was not valid JSON"],
+                    "databaseUsed": False
+                }
+
+        except Exception as e:
+            logger.error(f"Error calling model API: {str(e)}")
             return {
-                "convertedCode": "// Error: Invalid response format received from server",
-                "conversionNotes": f"Error processing response: {str(json_err)}",
-                "potentialIssues": ["Failed to process model response", "Response was not valid JSON"],
+                "convertedCode": "",
+                "conversionNotes": f"Error calling model API: {str(e)}",
+                "potentialIssues": ["Failed to get response from model"],
                 "databaseUsed": False
             }
-            
-    except Exception as e:
-        logger.error(f"Error calling model API: {str(e)}")
-        return {
-            "convertedCode": "",
-            "conversionNotes": f"Error calling model API: {str(e)}",
-            "potentialIssues": ["Failed to get response from model"],
-            "databaseUsed": False
-        }
 
 
     def _validate_code(self, conversion_result: Dict[str, Any], target_language: str) -> None:
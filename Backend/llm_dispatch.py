@@ -0,0 +1,54 @@
+"""
+Module for dispatching LLM requests.
+Requests that do not depend on each other (e.g. business and technical
+requirements for the same source code) are sent together so their
+round trips overlap instead of running one after another, and long
+responses can be streamed so callers process them while they are generated.
+"""
+
+import asyncio
+
+
+def run_concurrently(client_factory, *llm_calls):
+    """
+    Runs independent LLM calls concurrently on a shared async client.
+
+    A new client is created for each run because async clients are bound to
+    the event loop they were first used on.
+
+    Args:
+        client_factory (callable): Creates the async OpenAI client used for the calls
+        *llm_calls (callable): Async functions taking the client and returning the LLM response
+
+    Returns:
+        list: The result of each call, in the order the calls were given
+    """
+    async def run_all():
+        async with client_factory() as client:
+            return await asyncio.gather(*(llm_call(client) for llm_call in llm_calls))
+
+    return asyncio.run(run_all())
+
+
+def stream_completion(client, on_finish=None, **create_kwargs):
+    """
+    Streams a chat completion, yielding the generated text as it arrives.
+
+    Args:
+        client: The OpenAI client instance
+        on_finish (callable): Optional callback given the finish_reason of the response
+            (e.g. "stop", or "length" if it was cut off at max_tokens) when it ends
+        **create_kwargs: Arguments for client.chat.completions.create
+
+    Yields:
+        str: Consecutive pieces of the response text
+    """
+    response = client.chat.completions.create(stream=True, **create_kwargs)
+    for chunk in response:
+        if not chunk.choices:
+            continue
+        choice = chunk.choices[0]
+        if choice.delta.content:
+            yield choice.delta.content
+        if choice.finish_reason and on_finish is not None:
+            on_finish(choice.finish_reason)
@@ -0,0 +1,132 @@
+"""
+Module for caching LLM responses to the generated prompts.
+Responses are keyed on the prompt kind and the prompt inputs, with the
+line endings and trailing whitespace of the source code normalized so copies
+of the same COBOL program that differ only in those reuse a previous response
+instead of issuing a new LLM call. Only responses the caller accepts as
+complete are stored, so a retry after a failed response calls the LLM again.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of responses kept in memory before the oldest is evicted
+MAX_CACHE_ENTRIES = 256
+
+_TRAILING_WHITESPACE_PATTERN = re.compile(r"[ \t]+$", re.MULTILINE)
+
+_response_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def normalize_source_code(source_code):
+    """
+    Normalizes line endings and strips trailing whitespace so copies that differ only in those
+    share a cache entry. Other whitespace is kept, as it is significant in COBOL string literals
+    and fixed-column layout.
+
+    Args:
+        source_code (str): The source code to normalize
+
+    Returns:
+        str: The normalized source code
+    """
+    source_code = (source_code or "").replace("\r\n", "\n").replace("\r", "\n")
+    return _TRAILING_WHITESPACE_PATTERN.sub("", source_code).rstrip("\n")
+
+
+def _cache_key(prompt_kind, params):
+    """
+    Builds a stable cache key from the prompt kind and its input parameters.
+
+    Args:
+        prompt_kind (str): The kind of prompt (e.g. 'business_requirements')
+        params (dict): The inputs the prompt was built from
+
+    Returns:
+        str: Hex digest identifying the request
+    """
+    normalized = dict(params)
+    if "source_code" in normalized:
+        normalized["source_code"] = normalize_source_code(normalized["source_code"])
+    payload = json.dumps([prompt_kind, normalized], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _lookup(key, prompt_kind):
+    """Returns the cached response for the key, or None on a miss"""
+    with _cache_lock:
+        if key in _response_cache:
+            _response_cache.move_to_end(key)
+            logger.info(f"Response cache hit for {prompt_kind} prompt")
+            return _response_cache[key]
+    return None
+
+
+def _store(key, response):
+    """Stores a response, evicting the least recently used entries beyond the limit"""
+    with _cache_lock:
+        _response_cache[key] = response
+        _response_cache.move_to_end(key)
+        while len(_response_cache) > MAX_CACHE_ENTRIES:
+            _response_cache.popitem(last=False)
+
+
+def get_or_generate(prompt_kind, params, llm_fn, is_cacheable):
+    """
+    Returns the cached response for the given prompt inputs, calling the LLM on a miss.
+
+    Args:
+        prompt_kind (str): The kind of prompt (e.g. 'business_requirements')
+        params (dict): The inputs the prompt was built from
+        llm_fn (callable): Zero-argument function that calls the LLM and returns its response
+        is_cacheable (callable): Returns whether a response is complete enough to be reused
+
+    Returns:
+        str: The LLM response
+    """
+    key = _cache_key(prompt_kind, params)
+    response = _lookup(key, prompt_kind)
+    if response is None:
+        response = llm_fn()
+        if is_cacheable(response):
+            _store(key, response)
+    return response
+
+
+def cached_llm_call(prompt_kind, params, llm_call, is_cacheable):
+    """
+    Wraps an async LLM call so it reuses the cached response for the given prompt inputs.
+
+    Args:
+        prompt_kind (str): The kind of prompt (e.g. 'business_requirements')
+        params (dict): The inputs the prompt was built from
+        llm_call (callable): Async function taking the client and returning the LLM response
+        is_cacheable (callable): Returns whether a response is complete enough to be reused
+
+    Returns:
+        callable: Async function taking the client and returning the LLM response
+    """
+    key = _cache_key(prompt_kind, params)
+
+    async def call(client):
+        response = _lookup(key, prompt_kind)
+        if response is None:
+            response = await llm_call(client)
+            if is_cacheable(response):
+                _store(key, response)
+        return response
+
+    return call
+
+
+def clear_cache():
+    """Removes all cached responses"""
+    with _cache_lock:
+        _response_cache.clear()
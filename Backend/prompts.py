@@ -2,383 +2,1300 @@
 Module for generating prompts for code analysis and conversion.
 """
 
-def create_business_requirements_prompt(source_language, source_code, vsam_definition=""):
-    """
-    Creates a prompt for analyzing business requirements from source code.
-    
-    Args:
-        source_language (str): The programming language of the source code
-        source_code (str): The source code to analyze
-        vsam_definition (str): Optional VSAM file definition
-        
-    Returns:
-        str: The prompt for business requirements analysis
-    """
-    vsam_section = ""
-    if vsam_definition:
-        vsam_section = f"""
+import hashlib
+import itertools
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict, namedtuple
+from functools import lru_cache, wraps
+from string import Template
+from textwrap import dedent
+
+try:
+    import tiktoken
+except ImportError:  # Token counts fall back to a character-based estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Number of generated prompts kept per builder for repeated calls with the same inputs.
+# Prompts embed the full source code, so caching is off (0) unless enabled for deployments
+# that rebuild the same prompts, e.g. on retries.
+PROMPT_CACHE_SIZE = int(os.environ.get("PROMPT_CACHE_SIZE", 0))
+
+# Model whose tokenizer is used to measure prompt sizes
+TOKEN_COUNT_MODEL = "gpt-4o"
+
+# VSAM definition sections, per prompt kind; the target language sections are added with the profiles
+_VSAM_BUSINESS_TMPL = Template(dedent("""
         VSAM Definition:
-        {vsam_definition}
-        """
+        ${vsam_definition}
+        """))
+
+_VSAM_TECHNICAL_TMPL = Template(dedent("""
+        VSAM Definition:
+        ${vsam_definition}
+
+        Additional Requirements for VSAM:
+        - Analyze VSAM file structures and access methods
+        - Map VSAM record layouts to appropriate database tables or data structures
+        - Consider VSAM-specific operations (KSDS, RRDS, ESDS) and their equivalents
+        - Plan for data migration from VSAM to modern storage
+        """))
+
+_VSAM_CONVERSION_TMPL = Template(dedent("""
+        **VSAM Definition:**
+        ${vsam_definition}
+
+        **VSAM-Specific Instructions:**
+        - Convert VSAM file structures to appropriate database tables or data structures
+        - Map VSAM operations to equivalent database operations
+        - Maintain VSAM-like functionality (KSDS, RRDS, ESDS) using modern storage
+        - Ensure data integrity and transaction management
+        """))
+
+_VSAM_SECTIONS = {
+    "business": _VSAM_BUSINESS_TMPL,
+    "technical": _VSAM_TECHNICAL_TMPL,
+    "conversion": _VSAM_CONVERSION_TMPL,
+}
 
-    return f"""
-            You are a business analyst responsible for analyzing and documenting the business requirements from the following {source_language} code and VSAM definition. Your task is to interpret the code's intent and extract meaningful business logic suitable for non-technical stakeholders.
+# Business requirements analysis prompt
+_BUSINESS_REQUIREMENTS_TMPL = Template(dedent("""
+            You are a business analyst documenting the business requirements of the code and VSAM definition in the INPUT section below for non-technical stakeholders.
 
-            The code may be written in a legacy language like COBOL, possibly lacking comments or modern structure. You must infer business rules by examining variable names, control flow, data manipulation, and any input/output operations, including VSAM file structures. Focus only on **business intent**—do not describe technical implementation.
+            The code may be legacy COBOL without comments or modern structure. Infer business rules from variable names, control flow, data manipulation, input/output operations and VSAM file structures. Describe business intent only, not technical implementation.
 
-            ### Output Format Instructions:
-            - Use plain text headings and paragraphs with the following structure:
-            - Use '#' for main sections (equivalent to h2)
-            - Use '##' for subsection headings (equivalent to h4)
-            - Use '###' for regular paragraph text
-            - Use '-' for bullet points and emphasize them by using bold tone in phrasing
-            - Do not give response with ** anywhere.
-            - Do NOT use Markdown formatting like **bold**, _italic_, or backticks
+            Output format: plain text only, with no Markdown emphasis (no **, _ or backticks). Use '#' for sections, '##' for subsections, '###' for paragraph text and '-' for bullet points.
 
-            ### Structure your output into these 5 sections:
+            Use these 5 sections:
 
             # Overview
-            ## Purpose of the System  
-            ### Describe the system's primary function and how it fits into the business.
-            ## Context and Business Impact  
-            ### Explain the operational context and value the system provides.
+            ## Purpose of the System
+            ### The system's primary function and how it fits into the business.
+            ## Context and Business Impact
+            ### The operational context and value the system provides.
 
             # Objectives
-            ## Primary Objective  
-            ### Clearly state the system's main goal.
-            ## Key Outcomes  
-            ### Outline expected results (e.g., improved processing speed, customer satisfaction).
+            ## Primary Objective
+            ### The system's main goal.
+            ## Key Outcomes
+            ### Expected results (e.g., improved processing speed, customer satisfaction).
 
             # Business Rules & Requirements
-            ## Business Purpose  
-            ### Explain the business objective behind this specific module or logic.
-            ## Business Rules  
-            ### List the inferred rules/conditions the system enforces.
-            ## Impact on System  
-            ### Describe how this part affects the system's overall operation.
-            ## Constraints  
-            ### Note any business limitations or operational restrictions.
+            ## Business Purpose
+            ### The business objective behind this module or logic.
+            ## Business Rules
+            ### The inferred rules/conditions the system enforces.
+            ## Impact on System
+            ### How this part affects the system's overall operation.
+            ## Constraints
+            ### Business limitations or operational restrictions.
 
             # Assumptions & Recommendations
-            - Assumptions  
-            ### Describe what is presumed about data, processes, or environment.
-            - Recommendations  
-            ### Suggest enhancements or modernization directions.
+            - Assumptions
+            ### What is presumed about data, processes, or environment.
+            - Recommendations
+            ### Enhancements or modernization directions.
 
             # Expected Output
-            ## Output  
-            ### Describe the main outputs (e.g., reports, logs, updates).
-            ## Business Significance  
-            ### Explain why these outputs matter for business processes.
-            
+            ## Output
+            ### The main outputs (e.g., reports, logs, updates).
+            ## Business Significance
+            ### Why these outputs matter for business processes.
 
-            {source_language} Code:
-            {source_code}
+            === INPUT ===
+            ${source_language} Code:
+            ${source_code}
 
-            {vsam_section}
-            """
+            ${vsam_section}
+            """))
 
-def create_technical_requirements_prompt(source_language, target_language, source_code, vsam_definition=""):
-    """
-    Creates a prompt for analyzing technical requirements from source code.
-    
-    Args:
-        source_language (str): The programming language of the source code
-        target_language (str): The target programming language for conversion
-        source_code (str): The source code to analyze
-        vsam_definition (str): Optional VSAM file definition
-        
-    Returns:
-        str: The prompt for technical requirements analysis
-    """
-    vsam_section = ""
-    if vsam_definition:
-        vsam_section = f"""
-        VSAM Definition:
-        {vsam_definition}
+# Technical requirements analysis prompt
+_TECHNICAL_REQUIREMENTS_TMPL = Template(dedent("""
+            Analyze the code in the INPUT section below and extract the technical requirements for migrating it to the target language given there. Return plain text only, without Markdown formatting.
 
-        Additional Requirements for VSAM:
-        - Analyze VSAM file structures and access methods
-        - Map VSAM record layouts to appropriate database tables or data structures
-        - Consider VSAM-specific operations (KSDS, RRDS, ESDS) and their equivalents
-        - Plan for data migration from VSAM to modern storage
-        """
-
-    return f"""
-            Analyze the following {source_language} code and extract the technical requirements for migrating it to {target_language}.
-            Do not use any Markdown formatting (e.g., no **bold**, italics, or backticks).
-            Return plain text only.
-
-            **Focus on implementation details such as:**
-            "1. Examine the entire codebase first to understand architectural patterns and dependencies.\n"
-            "2. Analyze code in logical sections, mapping technical components to system functions.\n"
-            "3. For each M204 or COBOL-specific construct, identify the exact technical requirement it represents.\n"
-            "4. Document all technical constraints, dependencies, and integration points.\n"
-            "5. Pay special attention to error handling, transaction management, and data access patterns.\n\n"
-            "kindat each requirement as 'The system must [specific technical capability]' or 'The system should [specific technical capability]' with direct traceability to code sections.\n\n"
-            "Ensure your output captures ALL technical requirements including:\n"
-            "- Data structure definitions and relationships\n"
-            "- Processing algorithms and computation logic\n"
-            "- I/O operations and file handling\n"
-            "- Error handling and recovery mechanisms\n"
-            "- Performance considerations and optimizations\n"
-            "- Security controls and access management\n"
-            "- Integration protocols and external system interfaces\n"
-            "- Database Interactions and equivalent in target language\n"
-            "- VSAM file structures and their modern equivalents\n"
-
-
-            Format your response as a numbered list with '# Technical Requirements' as the title.
-            Each requirement should start with a number followed by a period (e.g., "1.", "2.", etc.)
-
-            {source_language} Code:
-            {source_code}
-
-            {vsam_section}
-             """
+            Approach:
+            1. Examine the entire codebase first to understand architectural patterns and dependencies.
+            2. Analyze code in logical sections, mapping technical components to system functions.
+            3. For each M204 or COBOL-specific construct, identify the exact technical requirement it represents.
+            4. Document all technical constraints, dependencies, and integration points.
+            5. Pay special attention to error handling, transaction management, and data access patterns.
 
-def create_java_code_conversion_prompt(
-    source_language,
-    source_code,
-    business_requirements,
-    technical_requirements,
-    db_setup_template,
-    vsam_definition="",
-    is_chunk=False,
-    chunk_type="mixed",
-    chunk_index=0,
-    total_chunks=1
-):
-    """
-    Creates a prompt for converting code from any language to Java.
-    Enforces Spring Boot layered architecture output format.
+            Frame each requirement as 'The system must [capability]' or 'The system should [capability]', with direct traceability to code sections.
 
-    Args:
-        source_language (str): The programming language of the source code
-        source_code (str): The source code to convert
-        business_requirements (str): The business requirements extracted from analysis
-        technical_requirements (str): The technical requirements extracted from analysis
-        db_setup_template (str): The database setup template for Java/Spring Boot
-        vsam_definition (str): Optional VSAM file definition
-        is_chunk (bool): Whether the code is a chunk of a larger program
-        chunk_type (str): Type of chunk ('declarations', 'procedures', or 'mixed')
-        chunk_index (int): Index of current chunk (0-based)
-        total_chunks (int): Total number of chunks
+            Cover ALL technical requirements: data structures and relationships, processing algorithms and computations, I/O and file handling, error handling and recovery, performance, security and access control, integration protocols and external interfaces, database interactions and their target language equivalents, and VSAM file structures and their modern equivalents.
 
-    Returns:
-        str: The prompt for Java code conversion
-    """
-    vsam_section = ""
-    if vsam_definition:
-        vsam_section = f"""
-        **VSAM Definition:**
-        {vsam_definition}
+            Format your response as a numbered list titled '# Technical Requirements', with each requirement starting with its number and a period (e.g., "1.", "2.").
 
-        **VSAM-Specific Instructions:**
-        - Convert VSAM file structures to appropriate JPA entities and database tables
-        - Map VSAM operations to Spring Data JPA repository methods
-        - Maintain VSAM-like functionality (KSDS, RRDS, ESDS) using modern JPA/Hibernate
-        - Ensure data integrity and transaction management using @Transactional
-        """
+            === INPUT ===
+            Target Language: ${target_language}
 
-    base_prompt = f"""
-        **Important- Please ensure that the {source_language} code is translated into its exact equivalent in Java, maintaining a clean Spring Boot layered architecture.**
-    Convert the following {source_language} code to Java using Spring Boot framework while strictly adhering to the provided business and technical requirements.
+            ${source_language} Code:
+            ${source_code}
 
-    **Source Language:** {source_language}
-    **Target Language:** Java (Spring Boot)
+            ${vsam_section}
+             """))
 
-    **Required Java Spring Boot Output Structure:**
-    
-    Your response must be organized in the following sections, each clearly marked with a section header:
+# Generic code conversion prompt sections
+_CONV_BASE_TMPL = Template(dedent("""
+    Convert the following ${source_language} code into its exact equivalent in ${target_language}, with a clean layered architecture, strictly adhering to the provided business and technical requirements.
+    ${output_structure}
+    Include only relevant code for each layer.
+    Ensure proper dependency injection and relationships between layers are maintained.
+
+    ${vsam_section}
+    """))
+
+# Output structure for free-form responses, split into sections by their headers
+_CONV_OUTPUT_SECTIONS = dedent("""
+    **Required Output Structure:**
+    Organize your response into the following sections, each starting with its section header:
 
     ##Entity
-    FileName: [EntityName].java
-    - Define JPA entities with @Entity annotation
-    - Include @Id, @GeneratedValue, @Column annotations
-    - Define all properties with appropriate data types
-    - Include relationships (@OneToMany, @ManyToOne, etc.)
-    - Add validation annotations (@NotNull, @Size, etc.)
-    - Include constructors, getters, and setters
+    FileName: 
+    - Domain entities/models with all properties, relationships and annotations/decorators
 
     ##Repository
-    FileName: [EntityName]Repository.java
-    - Extend JpaRepository<Entity, ID> or CrudRepository
-    - Define custom query methods using @Query annotation
-    - Include method signatures for CRUD operations
-    - Add @Repository annotation
+    FileName: 
+    - Repository interfaces with the data access methods and annotations/decorators
 
     ##Service
-    FileName: [EntityName]Service.java
-    - Implement service interface with @Service annotation
-    - Include business logic and validation
-    - Use @Autowired for dependency injection
-    - Add @Transactional for database operations
-    - Include error handling and exception management
+    FileName: 
+    - Service interfaces and implementations with business logic, transaction management and dependency injection
 
     ##Controller
-    FileName: [EntityName]Controller.java
-    - Define REST endpoints with @RestController annotation
-    - Include @RequestMapping for base path
-    - Define methods with @GetMapping, @PostMapping, @PutMapping, @DeleteMapping
-    - Include @RequestBody, @PathVariable, @RequestParam annotations
-    - Add proper HTTP response handling with ResponseEntity
-    - Include validation with @Valid annotation
+    FileName: 
+    - REST endpoints or API controllers with request/response handling and route mappings
 
     ##application.properties
-    - Database connection configuration (spring.datasource.*)
-    - JPA/Hibernate settings (spring.jpa.*)
-    - Connection pool settings (spring.datasource.hikari.*)
-    - Server port and context path settings
+    - Database connection, JPA/Hibernate and connection pool settings
 
     ##Dependencies
-    - Spring Boot parent dependency
-    - Spring Boot starter dependencies (web, data-jpa, etc.)
-    - Database driver dependencies
-    - Connection pool dependencies
-    - Testing dependencies
+    - All necessary dependencies, including database, connection pool and ORM dependencies
+    """)
+
+# Output structure for responses constrained by CONVERSION_RESPONSE_FORMAT
+_CONV_OUTPUT_SCHEMA = dedent("""
+    Return JSON matching the provided schema, with the files of each layer (entities, repositories, services, controllers) in its own field.
+    """)
+
+_CONV_CHUNK_INFO = dedent("""
+    **IMPORTANT CHUNKING INFORMATION:**
+    This code is one chunk of a larger program. Its position and chunk type are given just before the source code.
+    """)
+
+# Per-chunk-type instructions, kept free of chunk indices so they stay identical across chunks
+_CONV_CHUNK_INSTRUCTIONS = {
+    "declarations": dedent("""
+    **Instructions for Declarations Chunk:**
+    - Focus ONLY on converting data structures, file definitions, and variable declarations in this chunk
+    - Generate appropriate class structures, fields, and data types in the target language
+    - If needed, create class skeletons but DO NOT implement full methods
+    - Ensure your output can be combined with other chunks (proper scoping)
+    - Only include database connection setup code if this is the first chunk (chunk 1)
+    - If this is chunk 1, generate appropriate overall program structure
+    - DO NOT add any "placeholder" or "to be implemented" comments for other chunks
+    """),
+    "procedures": dedent("""
+    **Instructions for Procedures Chunk:**
+    - Focus ONLY on converting the business logic and procedures in this chunk
+    - Ensure method implementations and logic maintain the exact behavior as the original
+    - Only include necessary method/function definitions needed for this specific chunk
+    - Assume data declarations are handled in other chunks
+    - DO NOT include database connection code unless it's specifically part of this procedure chunk
+    - DO NOT duplicate database initialization that might have been in previous chunks
+    """),
+    "mixed": dedent("""
+    **Instructions for Mixed Content Chunk:**
+    - Convert BOTH declarations and procedures in this chunk as appropriate
+    - Maintain the structure and relationship between declarations and procedures
+    - Only include database initialization if it's actually in this chunk's source code
+    - If this is chunk 1, include appropriate program structure and entry points
+    - If this chunk contains multiple procedures, ensure they're properly organized
+    """),
+}
+
+_CONV_CHUNK_GUIDELINES = dedent("""
+    **Chunking Guidelines:**
+    - Generate ONLY code for this specific chunk - don't try to complete the entire program
+    - Ensure your code fragment is syntactically correct on its own
+    - Maintain consistent naming across chunks (follow naming patterns in the source)
+    - If this chunk references variables/methods defined in other chunks, continue using those names
+    """)
+
+_CONV_REQUIREMENTS_TMPL = Template(dedent("""
+    **Requirements:**
+    - Produce a complete, executable, idiomatic implementation following ${target_language} best practices
+    - Maintain all business logic, functionality, and behavior of the original code
+    - Include all necessary class definitions, method implementations, and boilerplate code
+    - Ensure consistent data handling, formatting, and computations
+    - Do not return any unwanted code in ${target_language} or functions which are not in ${source_language}.
+
+    **Database-Specific Instructions**
+    - If the ${source_language} code includes any database-related operations, automatically generate the necessary setup code
+    """))
+
+_CONV_DB_TMPL = Template(dedent("""
+    **Database Configuration:**
+    - Follow this example format for database initialization and setup:
+
+    ${db_setup_template}
+    """))
+
+_CONV_NO_DB = dedent("""
+    **Database Configuration:**
+    - DO NOT include database initialization code as it should be in chunk 1
+    """)
+
+# Analysis results passed into the conversion prompts; a section is left out when its requirements are empty
+_BUSINESS_CONTEXT_TMPL = Template(dedent("""
+    **Business Requirements:**
+    ${business_requirements}
+    """))
+
+_TECHNICAL_CONTEXT_TMPL = Template(dedent("""
+    **Technical Requirements:**
+    ${technical_requirements}
+    """))
+
+_CONV_SOURCE_TMPL = Template(dedent("""
+    **Source Code (${source_language}${chunk_label}):**
+    ${source_code}
+
+    IMPORTANT: Only return the complete converted code WITHOUT any markdown formatting. DO NOT wrap your code in triple backticks (```). Return just the raw code itself.
+    """))
+
+_CONV_CHUNK_LABEL_TMPL = Template(" - CHUNK ${chunk_number} of ${total_chunks}")
+
+_CONV_CHUNK_POSITION_TMPL = Template(dedent("""
+    (Chunk ${chunk_number} of ${total_chunks}, type=${chunk_type})
+    """))
+
+_CONV_REMINDER_TMPL = Template(dedent("""
+    REMINDER: You are converting ONLY CHUNK ${chunk_number} of ${total_chunks}. Do not try to implement logic from other chunks.
+    For database-related operations, only include connection initialization if this is chunk 1 or if the database operations 
+    are specifically in this chunk.
+    """))
+
+_CONV_DB_FILES = dedent("""
+    **Additional Database Setup Instructions:**
+    Include the ##application.properties and ##Dependencies sections above only if database operations are detected in the source code.
+    """)
+
+# Appended to single-request conversion prompts of every target language
+_DB_USAGE_REMINDER_TMPL = Template(
+    "\n\nIMPORTANT: Only include database initialization code if the source ${source_language} code contains "
+    "database or SQL operations. If the code is a simple algorithm (like sorting, calculation, etc.) without any "
+    "database interaction, do NOT include any database setup code in the converted ${target_language} code."
+)
+
+# Target language conversion prompt sections, shared by the Java and C# prompts.
+# ${name}, ${framework} and the other profile fields are filled in from a _ConversionProfile
+# at import; the remaining placeholders are substituted on every call.
+_TARGET_VSAM_TMPL = Template(dedent("""
+    **VSAM Definition:**
+    ${vsam_definition}
+
+    **VSAM-Specific Instructions:**
+    ${vsam_instructions}
+    """))
+
+_TARGET_BASE_TMPL = Template(dedent("""
+    **Important- Please ensure that the source code is translated into its exact equivalent in ${name}, maintaining a clean ${framework} layered architecture.**
+    Convert the source code in the INPUT section below to ${name} using ${platform} framework while strictly adhering to the provided business and technical requirements.
+
+    **Target Language:** ${name} (${platform})
+
+    **Required ${name} ${framework} Output Structure:**
+
+    Your response must be organized in the following sections, each clearly marked with a section header:
+
+    ${output_sections}
 
     Each section must be clearly separated using the above headers. Include only relevant code for each layer.
     Ensure proper dependency injection and relationships between layers are maintained.
-   
-    {vsam_section}
-    """
-    
-    if is_chunk:
-        base_prompt += f"""
+    """))
+
+_TARGET_CHUNK_INFO_TMPL = Template(dedent("""
     **IMPORTANT CHUNKING INFORMATION:**
-    This code is chunk {chunk_index + 1} of {total_chunks} from a larger {source_language} program.
-    Chunk type identified as: {chunk_type}
-    """
-        
-        if chunk_type == "declarations":
-            base_prompt += f"""
+    This code is chunk ${chunk_number} of ${total_chunks} from a larger ${source_language} program.
+    Chunk type identified as: ${chunk_type}
+    """))
+
+_TARGET_CHUNK_DECLARATIONS_TMPL = Template(dedent("""
     **Instructions for Declarations Chunk:**
-    - Focus ONLY on converting data structures to JPA entities in this chunk
-    - Generate appropriate @Entity classes with proper annotations
-    - Create repository interfaces extending JpaRepository
-    - If needed, create service interface skeletons but DO NOT implement full methods
-    - Ensure your output can be combined with other chunks (proper package structure)
-    - Only include application.properties and pom.xml if this is the first chunk (chunk {chunk_index + 1})
-    - If this is chunk 1, generate Application.java main class
+    ${declarations_instructions}
     - DO NOT add any "placeholder" or "to be implemented" comments for other chunks
-    """
-        
-        elif chunk_type == "procedures":
-            base_prompt += f"""
+    """))
+
+_TARGET_CHUNK_PROCEDURES_TMPL = Template(dedent("""
     **Instructions for Procedures Chunk:**
     - Focus ONLY on converting the business logic to service implementations and controllers
     - Ensure method implementations maintain the exact behavior as the original
-    - Create service implementations with @Service annotation
-    - Create REST controllers with appropriate mappings
-    - Assume entity classes and repositories are handled in other chunks
-    - DO NOT include application.properties or pom.xml unless specific to this procedure
-    - DO NOT duplicate main application class from previous chunks
-    """
-        
-        else:  # mixed type
-            base_prompt += f"""
+    ${procedures_instructions}
+    """))
+
+_TARGET_CHUNK_MIXED_TMPL = Template(dedent("""
     **Instructions for Mixed Content Chunk:**
-    - Convert BOTH entities and business logic as appropriate
-    - Create complete layers (Entity, Repository, Service, Controller) for this chunk
-    - Only include Application.java and configuration if it's actually in this chunk's source code
-    - If this is chunk 1, include appropriate Spring Boot application structure
+    ${mixed_instructions}
     - If this chunk contains multiple business processes, organize them properly
-    """
-            
-        base_prompt += f"""
-    **Chunking Guidelines for Java:**
+    """))
+
+_TARGET_CHUNK_GUIDELINES_TMPL = Template(dedent("""
+    **Chunking Guidelines for ${name}:**
     - Generate ONLY code for this specific chunk - don't try to complete the entire application
-    - Ensure proper package structure (com.example.app.entity, com.example.app.service, etc.)
-    - Maintain consistent naming across chunks following Java conventions
-    - If this chunk references classes defined in other chunks, use proper imports
-    """
-    
-    base_prompt += f"""
-    **Java-Specific Requirements:**
-    - Produce a complete, executable Spring Boot implementation
-    - Follow Java naming conventions (PascalCase for classes, camelCase for methods/variables)
-    - Use appropriate Spring Boot annotations and configurations
-    - Include proper exception handling with custom exceptions if needed
-    - Implement proper validation using Bean Validation annotations
-    - Use ResponseEntity for REST endpoints with appropriate HTTP status codes
+    ${chunk_guidelines}
+    """))
+
+_TARGET_REQUIREMENTS_TMPL = Template(dedent("""
+    **${name}-Specific Requirements:**
+    ${language_requirements}
     - Maintain all business logic, functionality, and behavior of the original code
-    - DO NOT include markdown code blocks (like ```java) in your response, just provide the raw code
-    - Do not return any unwanted code or functions which are not in {source_language}.
+    - Do not return any unwanted code or functions which are not in the source code.
+
+    **${framework} Best Practices:**
+    ${best_practices}
+
+    **Database-Specific Instructions for ${name}:**
+    ${database_instructions}
+    """))
+
+_TARGET_RAW_CODE_RULE_TMPL = Template(dedent("""
+    IMPORTANT: Only return the complete converted ${name} code WITHOUT any markdown formatting. DO NOT wrap your code in triple backticks (```). Return just the raw code itself.
+    """))
+
+# Per-call input, kept after all static instructions so calls for the same target share a prompt prefix
+_TARGET_INPUT_TMPL = Template(dedent("""
+    === INPUT ===
+    **Source Language:** ${source_language}
+    ${vsam_section}${requirements_section}"""))
+
+_TARGET_DB_TMPL = Template(dedent("""
+    **Database Configuration:**
+    - Follow this example format for ${framework} database configuration:
+
+    ${db_setup_template}
+    """))
+
+_TARGET_NO_DB = dedent("""
+    **Database Configuration:**
+    - DO NOT include database configuration as it should be in chunk 1
+    """)
+
+_TARGET_SOURCE_TMPL = Template(dedent("""
+    **Source Code (${source_language}${chunk_label}):**
+    ${source_code}
+    """))
+
+_TARGET_REMINDER_TMPL = Template(dedent("""
+    REMINDER: You are converting ONLY CHUNK ${chunk_number} of ${total_chunks}. Do not try to implement logic from other chunks.
+    For database-related operations, only include ${framework} configuration if this is chunk 1 or if the database operations
+    are specifically in this chunk.
+    """))
+
+_TARGET_SETUP_FILES_TMPL = Template(dedent("""
+    **Additional ${framework} Setup Instructions:**
+    Include the ##${config_file} and ##${build_file} sections above only if database operations are detected in the source code.
+    """))
+
+# Chunk instructions by chunk type, and database instructions by whether the chunk is the first
+_TARGET_CHUNK_SECTIONS = {
+    "declarations": _TARGET_CHUNK_DECLARATIONS_TMPL,
+    "procedures": _TARGET_CHUNK_PROCEDURES_TMPL,
+    "mixed": _TARGET_CHUNK_MIXED_TMPL,
+}
+
+_TARGET_DB_SECTIONS = {True: _TARGET_DB_TMPL, False: _TARGET_NO_DB}
+
+# Language-specific content of the target language conversion prompts. config_file and
+# build_file name the output sections that carry the configuration example and build dependencies.
+_ConversionProfile = namedtuple("_ConversionProfile", [
+    "name",
+    "framework",
+    "platform",
+    "default_db_setup",
+    "output_sections",
+    "vsam_instructions",
+    "declarations_instructions",
+    "procedures_instructions",
+    "mixed_instructions",
+    "chunk_guidelines",
+    "language_requirements",
+    "best_practices",
+    "database_instructions",
+    "config_file",
+    "config_example",
+    "build_file",
+    "build_file_label",
+    "build_dependencies",
+])
+
+_JAVA_PROFILE = _ConversionProfile(
+    name="Java",
+    framework="Spring Boot",
+    platform="Spring Boot",
+    default_db_setup="Standard Spring Boot JPA configuration will be used.",
+    output_sections=(
+        ("Entity", "[EntityName].java", (
+            "Define JPA entities with @Entity annotation",
+            "Include @Id, @GeneratedValue, @Column annotations",
+            "Define all properties with appropriate data types",
+            "Include relationships (@OneToMany, @ManyToOne, etc.)",
+            "Add validation annotations (@NotNull, @Size, etc.)",
+            "Include constructors, getters, and setters",
+        )),
+        ("Repository", "[EntityName]Repository.java", (
+            "Extend JpaRepository<Entity, ID> or CrudRepository",
+            "Define custom query methods using @Query annotation",
+            "Include method signatures for CRUD operations",
+            "Add @Repository annotation",
+        )),
+        ("Service", "[EntityName]Service.java", (
+            "Implement service interface with @Service annotation",
+            "Include business logic and validation",
+            "Use @Autowired for dependency injection",
+            "Add @Transactional for database operations",
+            "Include error handling and exception management",
+        )),
+        ("Controller", "[EntityName]Controller.java", (
+            "Define REST endpoints with @RestController annotation",
+            "Include @RequestMapping for base path",
+            "Define methods with @GetMapping, @PostMapping, @PutMapping, @DeleteMapping",
+            "Include @RequestBody, @PathVariable, @RequestParam annotations",
+            "Add proper HTTP response handling with ResponseEntity",
+            "Include validation with @Valid annotation",
+        )),
+        ("application.properties", None, (
+            "Database connection configuration (spring.datasource.*)",
+            "JPA/Hibernate settings (spring.jpa.*)",
+            "Connection pool settings (spring.datasource.hikari.*)",
+            "Server port and context path settings",
+        )),
+        ("Dependencies", "pom.xml", (
+            "Spring Boot parent dependency",
+            "Spring Boot starter dependencies (web, data-jpa, etc.)",
+            "Database driver dependencies",
+            "Connection pool dependencies",
+            "Testing dependencies",
+        )),
+    ),
+    vsam_instructions=(
+        "Convert VSAM file structures to appropriate JPA entities and database tables",
+        "Map VSAM operations to Spring Data JPA repository methods",
+        "Maintain VSAM-like functionality (KSDS, RRDS, ESDS) using modern JPA/Hibernate",
+        "Ensure data integrity and transaction management using @Transactional",
+    ),
+    declarations_instructions=(
+        "Focus ONLY on converting data structures to JPA entities in this chunk",
+        "Generate appropriate @Entity classes with proper annotations",
+        "Create repository interfaces extending JpaRepository",
+        "If needed, create service interface skeletons but DO NOT implement full methods",
+        "Ensure your output can be combined with other chunks (proper package structure)",
+        "Only include application.properties and pom.xml if this is the first chunk (chunk ${chunk_number})",
+        "If this is chunk 1, generate Application.java main class",
+    ),
+    procedures_instructions=(
+        "Create service implementations with @Service annotation",
+        "Create REST controllers with appropriate mappings",
+        "Assume entity classes and repositories are handled in other chunks",
+        "DO NOT include application.properties or pom.xml unless specific to this procedure",
+        "DO NOT duplicate main application class from previous chunks",
+    ),
+    mixed_instructions=(
+        "Convert BOTH entities and business logic as appropriate",
+        "Create complete layers (Entity, Repository, Service, Controller) for this chunk",
+        "Only include Application.java and configuration if it's actually in this chunk's source code",
+        "If this is chunk 1, include appropriate Spring Boot application structure",
+    ),
+    chunk_guidelines=(
+        "Ensure proper package structure (com.example.app.entity, com.example.app.service, etc.)",
+        "Maintain consistent naming across chunks following Java conventions",
+        "If this chunk references classes defined in other chunks, use proper imports",
+    ),
+    language_requirements=(
+        "Produce a complete, executable Spring Boot implementation",
+        "Follow Java naming conventions (PascalCase for classes, camelCase for methods/variables)",
+        "Use appropriate Spring Boot annotations and configurations",
+        "Include proper exception handling with custom exceptions if needed",
+        "Implement proper validation using Bean Validation annotations",
+        "Use ResponseEntity for REST endpoints with appropriate HTTP status codes",
+    ),
+    best_practices=(
+        "Use constructor injection over field injection",
+        "Implement proper error handling and logging",
+        "Use DTOs for API requests/responses when appropriate",
+        "Follow RESTful API design principles",
+        "Include proper transaction management with @Transactional",
+    ),
+    database_instructions=(
+        "Use Spring Data JPA for database operations",
+        "Create appropriate JPA entities with proper relationships",
+        "Use Hibernate as the JPA implementation",
+    ),
+    config_file="application.properties",
+    config_example="""\
+spring.datasource.url=jdbc:h2:mem:testdb
+spring.datasource.driverClassName=org.h2.Driver
+spring.datasource.username=sa
+spring.datasource.password=password
+spring.jpa.database-platform=org.hibernate.dialect.H2Dialect
+spring.jpa.hibernate.ddl-auto=update
+spring.jpa.show-sql=true
+server.port=8080""",
+    build_file="Dependencies",
+    build_file_label="Required dependencies:",
+    build_dependencies=(
+        "spring-boot-starter-web",
+        "spring-boot-starter-data-jpa",
+        "spring-boot-starter-validation",
+        "Database driver (H2, MySQL, PostgreSQL, etc.)",
+        "spring-boot-starter-test",
+    ),
+)
+
+_CSHARP_PROFILE = _ConversionProfile(
+    name="C#",
+    framework=".NET Core",
+    platform=".NET Core/ASP.NET Core",
+    default_db_setup="Standard Entity Framework Core configuration will be used.",
+    output_sections=(
+        ("Models/Entities", "[EntityName].cs", (
+            "Define Entity Framework models with appropriate attributes",
+            "Include [Key], [Column], [Table], [Required] attributes",
+            "Define all properties with appropriate C# data types",
+            "Include navigation properties for relationships",
+            "Add data validation attributes ([StringLength], [Range], etc.)",
+            "Include constructors and property accessors",
+        )),
+        ("Data/DbContext", "ApplicationDbContext.cs", (
+            "Inherit from DbContext",
+            "Define DbSet<Entity> properties for each entity",
+            "Override OnModelCreating for entity configuration",
+            "Include connection string configuration",
+        )),
+        ("Repositories/Interfaces", "I[EntityName]Repository.cs", (
+            "Define repository interface with CRUD method signatures",
+            "Include custom query method signatures",
+            "Follow repository pattern principles",
+        )),
+        ("Repositories/Implementations", "[EntityName]Repository.cs", (
+            "Implement repository interface",
+            "Inject ApplicationDbContext via constructor",
+            "Implement CRUD operations using Entity Framework",
+            "Include async/await patterns for database operations",
+            "Add error handling and logging",
+        )),
+        ("Services/Interfaces", "I[EntityName]Service.cs", (
+            "Define service interface with business method signatures",
+            "Include business logic method definitions",
+        )),
+        ("Services/Implementations", "[EntityName]Service.cs", (
+            "Implement service interface",
+            "Inject repository dependencies via constructor",
+            "Include business logic and validation",
+            "Use async/await for database operations",
+            "Add proper exception handling and logging",
+            "Include transaction management where needed",
+        )),
+        ("Controllers", "[EntityName]Controller.cs", (
+            "Inherit from ControllerBase or Controller",
+            "Add [ApiController] and [Route] attributes",
+            "Define action methods with [HttpGet], [HttpPost], [HttpPut], [HttpDelete]",
+            "Include [FromBody], [FromRoute], [FromQuery] parameter attributes",
+            "Use ActionResult<T> return types",
+            "Inject service dependencies via constructor",
+            "Add model validation with ModelState",
+            "Include proper HTTP status code responses",
+        )),
+        ("Program.cs", None, (
+            "Configure services and dependency injection",
+            "Add Entity Framework DbContext configuration",
+            "Configure middleware pipeline",
+            "Include CORS, authentication, and other middleware as needed",
+        )),
+        ("appsettings.json", None, (
+            "Database connection strings",
+            "Application configuration settings",
+            "Logging configuration",
+            "Environment-specific settings",
+        )),
+        ("[ProjectName].csproj", None, (
+            "Target framework (net6.0 or net8.0)",
+            "Package references for Entity Framework Core",
+            "Database provider packages",
+            "ASP.NET Core packages",
+            "Additional required NuGet packages",
+        )),
+        ("Startup.cs", None, (
+            "ConfigureServices method for service registration",
+            "Configure method for middleware configuration",
+        )),
+    ),
+    vsam_instructions=(
+        "Convert VSAM file structures to appropriate Entity Framework models and database tables",
+        "Map VSAM operations to Entity Framework repository methods",
+        "Maintain VSAM-like functionality (KSDS, RRDS, ESDS) using modern EF Core patterns",
+        "Ensure data integrity and transaction management using Entity Framework transactions",
+    ),
+    declarations_instructions=(
+        "Focus ONLY on converting data structures to Entity Framework models in this chunk",
+        "Generate appropriate model classes with EF attributes",
+        "Create DbContext with DbSet properties",
+        "Create repository interfaces but DO NOT implement full repository classes",
+        "Ensure your output can be combined with other chunks (proper namespace structure)",
+        "Only include appsettings.json and .csproj if this is the first chunk (chunk ${chunk_number})",
+        "If this is chunk 1, generate Program.cs with basic configuration",
+    ),
+    procedures_instructions=(
+        "Create service implementations and repository implementations",
+        "Create API controllers with appropriate action methods",
+        "Assume model classes and DbContext are handled in other chunks",
+        "DO NOT include appsettings.json or .csproj unless specific to this procedure",
+        "DO NOT duplicate Program.cs configuration from previous chunks",
+    ),
+    mixed_instructions=(
+        "Convert BOTH models and business logic as appropriate",
+        "Create complete layers (Models, Repositories, Services, Controllers) for this chunk",
+        "Only include Program.cs and configuration if it's actually in this chunk's source code",
+        "If this is chunk 1, include appropriate .NET Core application structure",
+    ),
+    chunk_guidelines=(
+        "Ensure proper namespace structure (ProjectName.Models, ProjectName.Services, etc.)",
+        "Maintain consistent naming across chunks following C# conventions",
+        "If this chunk references classes defined in other chunks, use proper using statements",
+    ),
+    language_requirements=(
+        "Produce a complete, executable .NET Core application",
+        "Follow C# naming conventions (PascalCase for classes/methods/properties, camelCase for fields/parameters)",
+        "Use appropriate .NET Core attributes and configurations",
+        "Include proper exception handling with custom exceptions if needed",
+        "Implement async/await patterns for I/O operations",
+        "Use ActionResult<T> for controller action return types",
+        "Use dependency injection throughout the application",
+    ),
+    best_practices=(
+        "Use constructor injection for dependency injection",
+        "Implement proper error handling and logging using ILogger",
+        "Use DTOs/ViewModels for API requests/responses when appropriate",
+        "Follow RESTful API design principles",
+        "Include proper model validation using Data Annotations",
+        "Use async/await consistently for database operations",
+        "Implement proper disposal patterns for resources",
+    ),
+    database_instructions=(
+        "Use Entity Framework Core for database operations",
+        "Create appropriate Entity Framework models with proper relationships",
+        "Use Code First approach with migrations",
+    ),
+    config_file="appsettings.json",
+    config_example="""\
+{
+  "ConnectionStrings": {
+    "DefaultConnection": "Server=(localdb)\\mssqllocaldb;Database=YourAppDb;Trusted_Connection=true;MultipleActiveResultSets=true"
+  },
+  "Logging": {
+    "LogLevel": {
+      "Default": "Information",
+      "Microsoft.AspNetCore": "Warning"
+    }
+  },
+  "AllowedHosts": "*"
+}""",
+    build_file="[ProjectName].csproj",
+    build_file_label="Required package references:",
+    build_dependencies=(
+        "Microsoft.AspNetCore.App (framework reference)",
+        "Microsoft.EntityFrameworkCore",
+        "Microsoft.EntityFrameworkCore.SqlServer (or other provider)",
+        "Microsoft.EntityFrameworkCore.Tools",
+        "Microsoft.EntityFrameworkCore.Design",
+    ),
+)
+
+_CONVERSION_PROFILES = {
+    "java": _JAVA_PROFILE,
+    "csharp": _CSHARP_PROFILE,
+}
+
+# Conversion profile keys by lowercased target language name
+_CONVERSION_PROFILE_KEYS = {"java": "java", "c#": "csharp", "csharp": "csharp"}
+
+
+def _bullets(items):
+    """Renders items as a '-' bullet list"""
+    return "\n".join(f"- {item}" for item in items)
+
+
+def _profile_fields(profile):
+    """
+    Renders the fields of a conversion profile for substitution into the target templates.
+
+    Args:
+        profile (_ConversionProfile): The target language profile
+
+    Returns:
+        dict: Template field values
+    """
+    fields = profile._asdict()
+
+    def render_section(header, file_name, items):
+        lines = [f"##{header}"]
+        if file_name:
+            lines.append(f"FileName: {file_name}")
+        lines.append(_bullets(items))
+        # The configuration and build file examples live in their output sections only
+        if header == profile.config_file:
+            lines += ["Example configuration:", profile.config_example]
+        elif header == profile.build_file:
+            lines += [profile.build_file_label, _bullets(profile.build_dependencies)]
+        return "\n".join(lines)
+
+    fields["output_sections"] = "\n\n".join(render_section(*section) for section in profile.output_sections)
+    for name in ("declarations_instructions", "procedures_instructions", "mixed_instructions",
+                 "chunk_guidelines", "language_requirements", "best_practices",
+                 "database_instructions"):
+        fields[name] = _bullets(fields[name])
+    return fields
+
+
+def _compile_static_prefix(profile):
+    """
+    Renders the instructions that open every conversion prompt for a target language.
+    They are identical across calls, so the provider can cache them as a prompt prefix.
+
+    Args:
+        profile (_ConversionProfile): The target language profile
+
+    Returns:
+        str: The static prompt prefix
+    """
+    fields = _profile_fields(profile)
+    return "".join(section.substitute(fields) for section in (
+        _TARGET_BASE_TMPL, _TARGET_REQUIREMENTS_TMPL, _TARGET_SETUP_FILES_TMPL, _TARGET_RAW_CODE_RULE_TMPL
+    ))
+
+
+def _compile_conversion_templates(target, profile):
+    """
+    Precompiles the per-call input section of the conversion prompt for every shape a target
+    language builder can produce: a whole program, or a chunk of each type as the first or a
+    later chunk.
+
+    Args:
+        target (str): Target language key
+        profile (_ConversionProfile): The target language profile
+
+    Returns:
+        dict: The template of the input before the source code and the text after it, keyed by
+            (target, chunk type or None for a whole program, is first chunk)
+    """
+    fields = _profile_fields(profile)
+
+    def compile_variant(chunk_label, *sections):
+        variant_fields = dict(fields, chunk_label=chunk_label)
+        head, tail = "".join(
+            section.safe_substitute(variant_fields) if isinstance(section, Template) else section.replace("$", "$$")
+            for section in sections
+        ).split("${source_code}")
+        # The source code is kept out of the template so large programs are not copied into the input
+        return Template(head), Template(tail).substitute()
+
+    templates = {(target, None, True): compile_variant("", _TARGET_INPUT_TMPL, _TARGET_DB_TMPL, _TARGET_SOURCE_TMPL)}
+    for chunk_type, instructions in _TARGET_CHUNK_SECTIONS.items():
+        for is_first_chunk, db_section in _TARGET_DB_SECTIONS.items():
+            templates[(target, chunk_type, is_first_chunk)] = compile_variant(
+                _CONV_CHUNK_LABEL_TMPL.template, _TARGET_INPUT_TMPL, db_section,
+                _TARGET_CHUNK_INFO_TMPL, instructions, _TARGET_CHUNK_GUIDELINES_TMPL,
+                _TARGET_REMINDER_TMPL, _TARGET_SOURCE_TMPL
+            )
+    return templates
+
+
+_CONVERSION_PREFIXES = {target: _compile_static_prefix(profile) for target, profile in _CONVERSION_PROFILES.items()}
+
+
+def _compile_batch_sections(profile):
+    """
+    Renders the chunking sections of a target language used by batched conversion prompts.
+
+    Args:
+        profile (_ConversionProfile): The target language profile
+
+    Returns:
+        tuple: The chunking guidelines, and the chunk instructions keyed by chunk type
+    """
+    fields = _profile_fields(profile)
+
+    def render(section):
+        # The profile instructions refer to the first chunk by its number
+        return Template(section.substitute(fields)).safe_substitute(chunk_number=1)
+
+    return render(_TARGET_CHUNK_GUIDELINES_TMPL), {
+        chunk_type: render(section) for chunk_type, section in _TARGET_CHUNK_SECTIONS.items()
+    }
+
+
+_BATCH_SECTIONS = {target: _compile_batch_sections(profile) for target, profile in _CONVERSION_PROFILES.items()}
+
+
+def _compile_generic_conversion_templates():
+    """
+    Precompiles the generic conversion prompt for a whole program and for a chunk of each type
+    as the first or a later chunk. The cached header is the first placeholder, so a single substitute
+    call builds the whole prompt. Sections are ordered from job-invariant to chunk-specific.
+
+    Returns:
+        dict: Templates keyed by (chunk type or None for a whole program, is first chunk)
+    """
+    header = Template("${header}")
+    requirements_section = Template("${requirements_section}")
+    db_section = Template("${db_section}")
+
+    def compile_variant(chunk_label, *sections):
+        return Template("".join(
+            section.safe_substitute(chunk_label=chunk_label) if isinstance(section, Template) else section.replace("$", "$$")
+            for section in sections
+        ))
+
+    templates = {(None, True): compile_variant("", header, requirements_section, db_section, _CONV_SOURCE_TMPL)}
+    for chunk_type, instructions in _CONV_CHUNK_INSTRUCTIONS.items():
+        for is_first_chunk in (True, False):
+            templates[(chunk_type, is_first_chunk)] = compile_variant(
+                _CONV_CHUNK_LABEL_TMPL.template, header, _CONV_CHUNK_INFO, _CONV_CHUNK_GUIDELINES, requirements_section,
+                db_section if is_first_chunk else _CONV_NO_DB, instructions, _CONV_CHUNK_POSITION_TMPL,
+                _CONV_SOURCE_TMPL, _CONV_REMINDER_TMPL
+            )
+    return templates
+
+
+_GENERIC_CONVERSION_TEMPLATES = _compile_generic_conversion_templates()
+
+_CONVERSION_TEMPLATES = {
+    key: template
+    for target, profile in _CONVERSION_PROFILES.items()
+    for key, template in _compile_conversion_templates(target, profile).items()
+}
+
+
+# Target language VSAM sections, with the profile instructions filled in
+_VSAM_SECTIONS.update(
+    (target, Template(_TARGET_VSAM_TMPL.safe_substitute(vsam_instructions=_bullets(profile.vsam_instructions))))
+    for target, profile in _CONVERSION_PROFILES.items()
+)
+
+
+# Structured output schema for single-request responses to the generic conversion prompt,
+# whose output sections map onto its fields
+_CONVERSION_FILES_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "fileName": {"type": "string"},
+            "code": {"type": "string"}
+        },
+        "required": ["fileName", "code"],
+        "additionalProperties": False
+    }
+}
+
+CONVERSION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "entity": _CONVERSION_FILES_SCHEMA,
+        "repository": _CONVERSION_FILES_SCHEMA,
+        "service": _CONVERSION_FILES_SCHEMA,
+        "controller": _CONVERSION_FILES_SCHEMA,
+        "applicationProperties": {"type": "string"},
+        "dependencies": {"type": "array", "items": {"type": "string"}},
+        "conversionNotes": {"type": "string"},
+        "potentialIssues": {"type": "array", "items": {"type": "string"}},
+        "databaseUsed": {"type": "boolean"}
+    },
+    "required": [
+        "entity", "repository", "service", "controller", "applicationProperties",
+        "dependencies", "conversionNotes", "potentialIssues", "databaseUsed"
+    ],
+    "additionalProperties": False
+}
+
+CONVERSION_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "conversion", "schema": CONVERSION_SCHEMA, "strict": True}
+}
+
+# Schema fields holding generated files, with the section header each is rendered under
+_CONVERSION_FILE_SECTIONS = (
+    ("entity", "Entity"),
+    ("repository", "Repository"),
+    ("service", "Service"),
+    ("controller", "Controller"),
+)
+
+# Batched multi-chunk conversion prompt sections
+_CONV_BATCH_TMPL = Template(dedent("""
+    **BATCHED CHUNK CONVERSION:**
+    The source program has been split into ${total_chunks} chunks, each introduced by a "=== CHUNK n ===" header in the source code below.
+    - Convert every chunk, in order, applying the instructions for its chunk type to each chunk
+    - Begin the output for each chunk with a line containing only "##CHUNK n OUTPUT", where n is the chunk number
+    - Do not write anything before the "##CHUNK 1 OUTPUT" line
+    - Only include database initialization code in the output for chunk 1
+    """))
+
+_BATCH_OUTPUT_MARKER = re.compile(r"^[ \t]*##CHUNK (\d+) OUTPUT[ \t]*$", re.MULTILINE)
+
+# A chunk of a larger program and its chunk type ('declarations', 'procedures', or 'mixed')
+ChunkSpec = namedtuple("ChunkSpec", ["source_code", "chunk_type"], defaults=["mixed"])
+
+def _prompt_cache_key(args, kwargs):
+    """Returns a blake2b digest of the arguments of a prompt builder call"""
+    digest = hashlib.blake2b(digest_size=16)
+    for value in itertools.chain(args, itertools.chain.from_iterable(sorted(kwargs.items()))):
+        # repr escapes strings, so the separator cannot occur inside a value
+        digest.update(repr(value).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.digest()
+
+
+def _cached_prompt(builder):
+    """
+    Memoizes a prompt builder when PROMPT_CACHE_SIZE is set, so repeated calls with the
+    same inputs return the previously built prompt. Entries are keyed by a digest of the
+    arguments rather than the arguments themselves, so the cache does not keep the inputs
+    (e.g. the source code) alive alongside the prompts built from them.
+    """
+    if not PROMPT_CACHE_SIZE:
+        return builder
+
+    prompts = OrderedDict()
+    lock = threading.Lock()
+
+    @wraps(builder)
+    def wrapper(*args, **kwargs):
+        key = _prompt_cache_key(args, kwargs)
+        with lock:
+            if key in prompts:
+                prompts.move_to_end(key)
+                return prompts[key]
+        prompt = builder(*args, **kwargs)
+        with lock:
+            prompts[key] = prompt
+            while len(prompts) > PROMPT_CACHE_SIZE:
+                prompts.popitem(last=False)
+        return prompt
+
+    def cache_clear():
+        with lock:
+            prompts.clear()
+
+    wrapper.cache_clear = cache_clear
+    return wrapper
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model):
+    """
+    Returns the tiktoken encoding for a model, defaulting for unknown (e.g. deployment) names.
+    Returns None if tiktoken is unavailable or cannot load the encoding, e.g. because its
+    download is blocked in an offline deployment.
+    """
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning(f"Could not load the tiktoken encoding, estimating token counts instead: {str(e)}")
+        return None
+
+
+def count_tokens(text, model=TOKEN_COUNT_MODEL):
+    """
+    Counts the tokens in a prompt.
+
+    Args:
+        text (str): The prompt text
+        model (str): Model whose tokenizer is used
+
+    Returns:
+        int: Number of tokens, estimated at 4 characters per token if the tokenizer is unavailable
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _over_token_budget(prompt_segments, max_input_tokens):
+    """Checks whether the segments of a prompt exceed the optional token budget"""
+    if not max_input_tokens:
+        return False
+    token_count = sum(count_tokens(segment) for segment in prompt_segments)
+    if token_count <= max_input_tokens:
+        return False
+    logger.warning(f"Prompt has {token_count} tokens, exceeding the budget of {max_input_tokens}. "
+                   f"Omitting business and technical requirements.")
+    return True
+
+
+@lru_cache(maxsize=64)
+def _build_vsam_section(vsam_definition, kind):
+    """
+    Builds the VSAM definition section for a prompt.
+
+    Args:
+        vsam_definition (str): The VSAM file definition
+        kind (str): Prompt kind ('business', 'technical', or 'conversion'), or a target language
+            key ('java' or 'csharp') for a target language conversion prompt
+
+    Returns:
+        str: The VSAM section, or an empty string if there is no VSAM definition
+    """
+    if not vsam_definition:
+        return ""
+    return _VSAM_SECTIONS[kind].substitute(vsam_definition=vsam_definition)
+
+
+@lru_cache(maxsize=16)
+def _build_db_section(db_setup_template):
+    """
+    Builds the database setup section for a conversion prompt. The rendered section is
+    reused across all prompts of a job, which share the same DB setup template.
+
+    Args:
+        db_setup_template (str): The database setup template for the target language
+
+    Returns:
+        str: The database setup section, or an empty string if there is no DB setup template
+    """
+    if not db_setup_template:
+        return ""
+    return _CONV_DB_TMPL.substitute(db_setup_template=db_setup_template)
 
-    **Spring Boot Best Practices:**
-    - Use constructor injection over field injection
-    - Implement proper error handling and logging
-    - Use DTOs for API requests/responses when appropriate
-    - Follow RESTful API design principles
-    - Include proper transaction management with @Transactional
 
-    **Database-Specific Instructions for Java:**
-    - Use Spring Data JPA for database operations
-    - Create appropriate JPA entities with proper relationships
-    - Use Hibernate as the JPA implementation
+def _build_requirements_section(business_requirements, technical_requirements):
+    """
+    Builds the business and technical requirements sections of a conversion prompt,
+    leaving out the section of any requirements that are empty.
+
+    Args:
+        business_requirements (str): The business requirements extracted from analysis
+        technical_requirements (str): The technical requirements extracted from analysis
+
+    Returns:
+        str: The requirements sections
+    """
+    sections = []
+    if business_requirements:
+        sections.append(_BUSINESS_CONTEXT_TMPL.substitute(business_requirements=business_requirements))
+    if technical_requirements:
+        sections.append(_TECHNICAL_CONTEXT_TMPL.substitute(technical_requirements=technical_requirements))
+    return "".join(sections)
+
+
+@lru_cache(maxsize=64)
+def _build_conversion_header(source_language, target_language, vsam_definition, structured_output=False):
+    """
+    Builds the leading sections of a conversion prompt, which depend only on the
+    languages and the VSAM definition and so are shared by every chunk of a job.
+
+    Args:
+        source_language (str): The programming language of the source code
+        target_language (str): The target programming language for conversion
+        vsam_definition (str): Optional VSAM file definition
+        structured_output (bool): Whether the response is constrained by CONVERSION_RESPONSE_FORMAT
+
+    Returns:
+        str: The output structure, VSAM, requirements and database file sections
+    """
+    return "".join([
+        _CONV_BASE_TMPL.substitute(
+            source_language=source_language,
+            target_language=target_language,
+            output_structure=_CONV_OUTPUT_SCHEMA if structured_output else _CONV_OUTPUT_SECTIONS,
+            vsam_section=_build_vsam_section(vsam_definition, "conversion")
+        ),
+        _CONV_REQUIREMENTS_TMPL.substitute(
+            source_language=source_language,
+            target_language=target_language
+        ),
+        # The schema already has fields for the database configuration files
+        "" if structured_output else _CONV_DB_FILES,
+    ])
+
+
+@_cached_prompt
+def create_business_requirements_prompt(source_language, source_code, vsam_definition=""):
+    """
+    Creates a prompt for analyzing business requirements from source code.
+    
+    Args:
+        source_language (str): The programming language of the source code
+        source_code (str): The source code to analyze
+        vsam_definition (str): Optional VSAM file definition
+        
+    Returns:
+        str: The prompt for business requirements analysis
+    """
+    return _BUSINESS_REQUIREMENTS_TMPL.substitute(
+        source_language=source_language,
+        source_code=source_code,
+        vsam_section=_build_vsam_section(vsam_definition, "business")
+    )
+
+@_cached_prompt
+def create_technical_requirements_prompt(source_language, target_language, source_code, vsam_definition=""):
     """
+    Creates a prompt for analyzing technical requirements from source code.
     
-    # Only include DB setup template for first chunk or if it's a single chunk
-    if not is_chunk or chunk_index == 0:
-        base_prompt += f"""
-    - Follow this example format for Spring Boot database configuration:
+    Args:
+        source_language (str): The programming language of the source code
+        target_language (str): The target programming language for conversion
+        source_code (str): The source code to analyze
+        vsam_definition (str): Optional VSAM file definition
+        
+    Returns:
+        str: The prompt for technical requirements analysis
+    """
+    return _TECHNICAL_REQUIREMENTS_TMPL.substitute(
+        source_language=source_language,
+        target_language=target_language,
+        source_code=source_code,
+        vsam_section=_build_vsam_section(vsam_definition, "technical")
+    )
+
+def _build_target_conversion_segments(
+    target,
+    source_language,
+    source_code,
+    business_requirements,
+    technical_requirements,
+    db_setup_template,
+    vsam_definition,
+    is_chunk,
+    chunk_type,
+    chunk_index,
+    total_chunks,
+    max_input_tokens
+):
+    """
+    Creates a conversion prompt for a target language with a conversion profile.
+    Arguments are those of create_java_code_conversion_prompt, plus the target language key.
 
-    {db_setup_template if db_setup_template else 'Standard Spring Boot JPA configuration will be used.'}
+    Returns:
+        tuple: The static prompt prefix, the per-call input up to the source code, the source
+            code itself, and the text following it
     """
-    else:
-        base_prompt += f"""
-    - DO NOT include database configuration as it should be in chunk 1
+    is_first_chunk = not is_chunk or chunk_index == 0
+    # Unknown chunk types are treated as mixed content
+    variant = (chunk_type if chunk_type in _TARGET_CHUNK_SECTIONS else "mixed") if is_chunk else None
+
+    db_setup = db_setup_template or _CONVERSION_PROFILES[target].default_db_setup
+    requirements_section = _build_requirements_section(business_requirements, technical_requirements)
+
+    prefix = _CONVERSION_PREFIXES[target]
+    input_template, suffix = _CONVERSION_TEMPLATES[(target, variant, is_first_chunk)]
+    prompt_input = input_template.substitute(
+        source_language=source_language,
+        vsam_section=_build_vsam_section(vsam_definition, target),
+        chunk_number=chunk_index + 1,
+        total_chunks=total_chunks,
+        chunk_type=chunk_type,
+        db_setup_template=db_setup,
+        requirements_section=requirements_section
+    )
+    segments = (prefix, prompt_input, source_code, suffix)
+    if (business_requirements or technical_requirements) and _over_token_budget(segments, max_input_tokens):
+        # The requirements are informational, so drop them rather than overflow the model context
+        return _build_target_conversion_segments(
+            target, source_language, source_code, "", "", db_setup_template,
+            vsam_definition, is_chunk, chunk_type, chunk_index, total_chunks, None
+        )
+    return segments
+
+
+def _as_content_blocks(prompt_segments):
+    """Returns the non-empty prompt segments as chat message content blocks"""
+    return [{"type": "text", "text": text} for text in prompt_segments if text]
+
+
+@_cached_prompt
+def create_java_code_conversion_prompt(
+    source_language,
+    source_code,
+    business_requirements,
+    technical_requirements,
+    db_setup_template,
+    vsam_definition="",
+    is_chunk=False,
+    chunk_type="mixed",
+    chunk_index=0,
+    total_chunks=1,
+    max_input_tokens=None
+):
     """
+    Creates a prompt for converting code from any language to Java.
+    Enforces Spring Boot layered architecture output format.
 
-    # Include business and technical requirements for context
-    base_prompt += f"""
-    **Business Requirements:**
-    {business_requirements if business_requirements else 'None provided.'}
+    Args:
+        source_language (str): The programming language of the source code
+        source_code (str): The source code to convert
+        business_requirements (str): The business requirements extracted from analysis
+        technical_requirements (str): The technical requirements extracted from analysis
+        db_setup_template (str): The database setup template for Java/Spring Boot
+        vsam_definition (str): Optional VSAM file definition
+        is_chunk (bool): Whether the code is a chunk of a larger program
+        chunk_type (str): Type of chunk ('declarations', 'procedures', or 'mixed')
+        chunk_index (int): Index of current chunk (0-based)
+        total_chunks (int): Total number of chunks
+        max_input_tokens (int): Optional token budget; the business and technical requirements
+            are left out of the prompt if it would exceed the budget
 
-    **Technical Requirements:**
-    {technical_requirements if technical_requirements else 'None provided.'}
+    Returns:
+        str: The prompt for Java code conversion
+    """
+    return "".join(_build_target_conversion_segments(
+        "java", source_language, source_code, business_requirements, technical_requirements,
+        db_setup_template, vsam_definition, is_chunk, chunk_type, chunk_index, total_chunks,
+        max_input_tokens
+    ))
 
-    **Source Code ({source_language}{' - CHUNK ' + str(chunk_index + 1) + ' of ' + str(total_chunks) if is_chunk else ''}):**
-    {source_code}
 
-    IMPORTANT: Only return the complete converted Java code WITHOUT any markdown formatting. DO NOT wrap your code in triple backticks (```). Return just the raw code itself.
+def create_java_code_conversion_prompt_blocks(
+    source_language,
+    source_code,
+    business_requirements,
+    technical_requirements,
+    db_setup_template,
+    vsam_definition="",
+    is_chunk=False,
+    chunk_type="mixed",
+    chunk_index=0,
+    total_chunks=1,
+    max_input_tokens=None
+):
     """
+    Creates the Java code conversion prompt as chat message content blocks: the static
+    instructions, byte-identical across calls, followed by the per-call input, with the source
+    code in a block of its own so it is never copied into a joined prompt. Takes the
+    same arguments as create_java_code_conversion_prompt.
 
-    if is_chunk:
-        # Add additional reminder for chunked processing
-        base_prompt += f"""
-    REMINDER: You are converting ONLY CHUNK {chunk_index + 1} of {total_chunks}. Do not try to implement logic from other chunks.
-    For database-related operations, only include Spring Boot configuration if this is chunk 1 or if the database operations 
-    are specifically in this chunk.
+    Returns:
+        list: Text content blocks for a user message
     """
+    return _as_content_blocks(_build_target_conversion_segments(
+        "java", source_language, source_code, business_requirements, technical_requirements,
+        db_setup_template, vsam_definition, is_chunk, chunk_type, chunk_index, total_chunks,
+        max_input_tokens
+    ))
 
-    base_prompt += f"""
-    **Additional Spring Boot Setup Instructions:**
-    If database operations are detected in the source code, include these files in your output:
-
-    ##application.properties
-    Example configuration:
-    spring.datasource.url=jdbc:h2:mem:testdb
-    spring.datasource.driverClassName=org.h2.Driver
-    spring.datasource.username=sa
-    spring.datasource.password=password
-    spring.jpa.database-platform=org.hibernate.dialect.H2Dialect
-    spring.jpa.hibernate.ddl-auto=update
-    spring.jpa.show-sql=true
-    server.port=8080
-
-    ##pom.xml
-    Required dependencies:
-    - spring-boot-starter-web
-    - spring-boot-starter-data-jpa
-    - spring-boot-starter-validation
-    - Database driver (H2, MySQL, PostgreSQL, etc.)
-    - spring-boot-starter-test
-    """
-
-    return base_prompt
 
+@_cached_prompt
 def create_csharp_code_conversion_prompt(
     source_language,
     source_code,
@@ -389,7 +1306,8 @@ def create_csharp_code_conversion_prompt(
     is_chunk=False,
     chunk_type="mixed",
     chunk_index=0,
-    total_chunks=1
+    total_chunks=1,
+    max_input_tokens=None
 ):
     """
     Creates a prompt for converting code from any language to C#.
@@ -406,261 +1324,49 @@ def create_csharp_code_conversion_prompt(
         chunk_type (str): Type of chunk ('declarations', 'procedures', or 'mixed')
         chunk_index (int): Index of current chunk (0-based)
         total_chunks (int): Total number of chunks
+        max_input_tokens (int): Optional token budget; the business and technical requirements
+            are left out of the prompt if it would exceed the budget
 
     Returns:
         str: The prompt for C# code conversion
     """
-    vsam_section = ""
-    if vsam_definition:
-        vsam_section = f"""
-        **VSAM Definition:**
-        {vsam_definition}
-
-        **VSAM-Specific Instructions:**
-        - Convert VSAM file structures to appropriate Entity Framework models and database tables
-        - Map VSAM operations to Entity Framework repository methods
-        - Maintain VSAM-like functionality (KSDS, RRDS, ESDS) using modern EF Core patterns
-        - Ensure data integrity and transaction management using Entity Framework transactions
-        """
-
-    base_prompt = f"""
-        **Important- Please ensure that the {source_language} code is translated into its exact equivalent in C#, maintaining a clean .NET Core layered architecture.**
-    Convert the following {source_language} code to C# using .NET Core/ASP.NET Core framework while strictly adhering to the provided business and technical requirements.
-
-    **Source Language:** {source_language}
-    **Target Language:** C# (.NET Core/ASP.NET Core)
-
-    **Required C# .NET Core Output Structure:**
-    
-    Your response must be organized in the following sections, each clearly marked with a section header:
-
-    ##Models/Entities
-    FileName: [EntityName].cs
-    - Define Entity Framework models with appropriate attributes
-    - Include [Key], [Column], [Table], [Required] attributes
-    - Define all properties with appropriate C# data types
-    - Include navigation properties for relationships
-    - Add data validation attributes ([StringLength], [Range], etc.)
-    - Include constructors and property accessors
-
-    ##Data/DbContext
-    FileName: ApplicationDbContext.cs
-    - Inherit from DbContext
-    - Define DbSet<Entity> properties for each entity
-    - Override OnModelCreating for entity configuration
-    - Include connection string configuration
-
-    ##Repositories/Interfaces
-    FileName: I[EntityName]Repository.cs
-    - Define repository interface with CRUD method signatures
-    - Include custom query method signatures
-    - Follow repository pattern principles
-
-    ##Repositories/Implementations  
-    FileName: [EntityName]Repository.cs
-    - Implement repository interface
-    - Inject ApplicationDbContext via constructor
-    - Implement CRUD operations using Entity Framework
-    - Include async/await patterns for database operations
-    - Add error handling and logging
-
-    ##Services/Interfaces
-    FileName: I[EntityName]Service.cs
-    - Define service interface with business method signatures
-    - Include business logic method definitions
-
-    ##Services/Implementations
-    FileName: [EntityName]Service.cs
-    - Implement service interface
-    - Inject repository dependencies via constructor
-    - Include business logic and validation
-    - Use async/await for database operations
-    - Add proper exception handling and logging
-    - Include transaction management where needed
-
-    ##Controllers
-    FileName: [EntityName]Controller.cs
-    - Inherit from ControllerBase or Controller
-    - Add [ApiController] and [Route] attributes
-    - Define action methods with [HttpGet], [HttpPost], [HttpPut], [HttpDelete]
-    - Include [FromBody], [FromRoute], [FromQuery] parameter attributes
-    - Use ActionResult<T> return types
-    - Inject service dependencies via constructor
-    - Add model validation with ModelState
-    - Include proper HTTP status code responses
-
-    ##Program.cs
-    - Configure services and dependency injection
-    - Add Entity Framework DbContext configuration
-    - Configure middleware pipeline
-    - Include CORS, authentication, and other middleware as needed
-
-    ##appsettings.json
-    - Database connection strings
-    - Application configuration settings
-    - Logging configuration
-    - Environment-specific settings
-
-    ##[ProjectName].csproj
-    - Target framework (net6.0 or net8.0)
-    - Package references for Entity Framework Core
-    - Database provider packages
-    - ASP.NET Core packages
-    - Additional required NuGet packages
-
-    ##Startup.cs
-    - ConfigureServices method for service registration
-    - Configure method for middleware configuration
-    
-
-    Each section must be clearly separated using the above headers. Include only relevant code for each layer.
-    Ensure proper dependency injection and relationships between layers are maintained.
-   
-    {vsam_section}
-    """
-    
-    if is_chunk:
-        base_prompt += f"""
-    **IMPORTANT CHUNKING INFORMATION:**
-    This code is chunk {chunk_index + 1} of {total_chunks} from a larger {source_language} program.
-    Chunk type identified as: {chunk_type}
-    """
-        
-        if chunk_type == "declarations":
-            base_prompt += f"""
-    **Instructions for Declarations Chunk:**
-    - Focus ONLY on converting data structures to Entity Framework models in this chunk
-    - Generate appropriate model classes with EF attributes
-    - Create DbContext with DbSet properties
-    - Create repository interfaces but DO NOT implement full repository classes
-    - Ensure your output can be combined with other chunks (proper namespace structure)
-    - Only include appsettings.json and .csproj if this is the first chunk (chunk {chunk_index + 1})
-    - If this is chunk 1, generate Program.cs with basic configuration
-    - DO NOT add any "placeholder" or "to be implemented" comments for other chunks
-    """
-        
-        elif chunk_type == "procedures":
-            base_prompt += f"""
-    **Instructions for Procedures Chunk:**
-    - Focus ONLY on converting the business logic to service implementations and controllers
-    - Ensure method implementations maintain the exact behavior as the original
-    - Create service implementations and repository implementations
-    - Create API controllers with appropriate action methods
-    - Assume model classes and DbContext are handled in other chunks
-    - DO NOT include appsettings.json or .csproj unless specific to this procedure
-    - DO NOT duplicate Program.cs configuration from previous chunks
-    """
-        
-        else:  # mixed type
-            base_prompt += f"""
-    **Instructions for Mixed Content Chunk:**
-    - Convert BOTH models and business logic as appropriate
-    - Create complete layers (Models, Repositories, Services, Controllers) for this chunk
-    - Only include Program.cs and configuration if it's actually in this chunk's source code
-    - If this is chunk 1, include appropriate .NET Core application structure
-    - If this chunk contains multiple business processes, organize them properly
-    """
-            
-        base_prompt += f"""
-    **Chunking Guidelines for C#:**
-    - Generate ONLY code for this specific chunk - don't try to complete the entire application
-    - Ensure proper namespace structure (ProjectName.Models, ProjectName.Services, etc.)
-    - Maintain consistent naming across chunks following C# conventions
-    - If this chunk references classes defined in other chunks, use proper using statements
-    """
-    
-    base_prompt += f"""
-    **C#-Specific Requirements:**
-    - Produce a complete, executable .NET Core application
-    - Follow C# naming conventions (PascalCase for classes/methods/properties, camelCase for fields/parameters)
-    - Use appropriate .NET Core attributes and configurations
-    - Include proper exception handling with custom exceptions if needed
-    - Implement async/await patterns for I/O operations
-    - Use ActionResult<T> for controller action return types
-    - Use dependency injection throughout the application
-    - Maintain all business logic, functionality, and behavior of the original code
-    - DO NOT include markdown code blocks (like ```csharp) in your response, just provide the raw code
-    - Do not return any unwanted code or functions which are not in {source_language}.
-
-    **.NET Core Best Practices:**
-    - Use constructor injection for dependency injection
-    - Implement proper error handling and logging using ILogger
-    - Use DTOs/ViewModels for API requests/responses when appropriate
-    - Follow RESTful API design principles
-    - Include proper model validation using Data Annotations
-    - Use async/await consistently for database operations
-    - Implement proper disposal patterns for resources
-
-    **Database-Specific Instructions for C#:**
-    - Use Entity Framework Core for database operations
-    - Create appropriate Entity Framework models with proper relationships
-    - Use Code First approach with migrations
-    """
-    
-    # Only include DB setup template for first chunk or if it's a single chunk
-    if not is_chunk or chunk_index == 0:
-        base_prompt += f"""
-    - Follow this example format for .NET Core database configuration:
-
-    {db_setup_template if db_setup_template else 'Standard Entity Framework Core configuration will be used.'}
-    """
-    else:
-        base_prompt += f"""
-    - DO NOT include database configuration as it should be in chunk 1
-    """
+    return "".join(_build_target_conversion_segments(
+        "csharp", source_language, source_code, business_requirements, technical_requirements,
+        db_setup_template, vsam_definition, is_chunk, chunk_type, chunk_index, total_chunks,
+        max_input_tokens
+    ))
 
-    # Include business and technical requirements for context
-    base_prompt += f"""
-    **Business Requirements:**
-    {business_requirements if business_requirements else 'None provided.'}
-
-    **Technical Requirements:**
-    {technical_requirements if technical_requirements else 'None provided.'}
-
-    **Source Code ({source_language}{' - CHUNK ' + str(chunk_index + 1) + ' of ' + str(total_chunks) if is_chunk else ''}):**
-    {source_code}
 
-    IMPORTANT: Only return the complete converted C# code WITHOUT any markdown formatting. DO NOT wrap your code in triple backticks (```). Return just the raw code itself.
+def create_csharp_code_conversion_prompt_blocks(
+    source_language,
+    source_code,
+    business_requirements,
+    technical_requirements,
+    db_setup_template,
+    vsam_definition="",
+    is_chunk=False,
+    chunk_type="mixed",
+    chunk_index=0,
+    total_chunks=1,
+    max_input_tokens=None
+):
     """
+    Creates the C# code conversion prompt as chat message content blocks: the static
+    instructions, byte-identical across calls, followed by the per-call input, with the source
+    code in a block of its own so it is never copied into a joined prompt. Takes the
+    same arguments as create_csharp_code_conversion_prompt.
 
-    if is_chunk:
-        # Add additional reminder for chunked processing
-        base_prompt += f"""
-    REMINDER: You are converting ONLY CHUNK {chunk_index + 1} of {total_chunks}. Do not try to implement logic from other chunks.
-    For database-related operations, only include .NET Core configuration if this is chunk 1 or if the database operations 
-    are specifically in this chunk.
+    Returns:
+        list: Text content blocks for a user message
     """
+    return _as_content_blocks(_build_target_conversion_segments(
+        "csharp", source_language, source_code, business_requirements, technical_requirements,
+        db_setup_template, vsam_definition, is_chunk, chunk_type, chunk_index, total_chunks,
+        max_input_tokens
+    ))
 
-    base_prompt += f"""
-    **Additional .NET Core Setup Instructions:**
-    If database operations are detected in the source code, include these files in your output:
-
-    ##appsettings.json
-    Example configuration:
-    {{
-      "ConnectionStrings": {{
-        "DefaultConnection": "Server=(localdb)\\mssqllocaldb;Database=YourAppDb;Trusted_Connection=true;MultipleActiveResultSets=true"
-      }},
-      "Logging": {{
-        "LogLevel": {{
-          "Default": "Information",
-          "Microsoft.AspNetCore": "Warning"
-        }}
-      }},
-      "AllowedHosts": "*"
-    }}
-
-    ##[ProjectName].csproj
-    Required package references:
-    - Microsoft.AspNetCore.App (framework reference)
-    - Microsoft.EntityFrameworkCore
-    - Microsoft.EntityFrameworkCore.SqlServer (or other provider)
-    - Microsoft.EntityFrameworkCore.Tools
-    - Microsoft.EntityFrameworkCore.Design
-    """
-
-    return base_prompt
 
+@_cached_prompt
 def create_code_conversion_prompt(
     source_language,
     target_language,
@@ -672,7 +1378,9 @@ def create_code_conversion_prompt(
     is_chunk=False,
     chunk_type="mixed",
     chunk_index=0,
-    total_chunks=1
+    total_chunks=1,
+    max_input_tokens=None,
+    structured_output=False
 ):
     """
     Creates a prompt for converting code from one language to another.
@@ -690,220 +1398,226 @@ def create_code_conversion_prompt(
         chunk_type (str): Type of chunk ('declarations', 'procedures', or 'mixed')
         chunk_index (int): Index of current chunk (0-based)
         total_chunks (int): Total number of chunks
+        max_input_tokens (int): Optional token budget; the business and technical requirements
+            are left out of the prompt if it would exceed the budget
+        structured_output (bool): Whether the response is constrained by CONVERSION_RESPONSE_FORMAT
+            instead of being split into sections by their headers
 
     Returns:
         str: The prompt for code conversion
     """
-    vsam_section = ""
-    if vsam_definition:
-        vsam_section = f"""
-        **VSAM Definition:**
-        {vsam_definition}
-
-        **VSAM-Specific Instructions:**
-        - Convert VSAM file structures to appropriate database tables or data structures
-        - Map VSAM operations to equivalent database operations
-        - Maintain VSAM-like functionality (KSDS, RRDS, ESDS) using modern storage
-        - Ensure data integrity and transaction management
-        """
-
-    base_prompt = f"""
-        **Important- Please ensure that the {source_language} code is translated into its exact equivalent in {target_language}, maintaining a clean layered architecture.**
-    Convert the following {source_language} code to {target_language} while strictly adhering to the provided business and technical requirements.
-
-    **Source Language:** {source_language}
-    **Target Language:** {target_language}
-
-    **Required Output Structure:**
-    
-    Your response must be organized in the following sections, each clearly marked with a section header:
-
-    
-    ##Entity
-    FileName: 
-    - Define all entities and their properties
-    - Define all domain entities/models
-    - Include all necessary properties and relationships
-    - Add appropriate annotations/decorators
-
-    ##Repository
-    FileName: 
-    - Define repository interfaces
-    - Include necessary data access methods
-    - Add appropriate annotations/decorators
-
-
-    ##Service
-    FileName: 
-    - Define service interfaces and implementations
-    - Include business logic and transaction management
-    - Add appropriate dependency injections and annotations
-
-    ##Controller
-    FileName: 
-    - Define REST endpoints or API controllers
-    - Include request/response handling
-    - Add appropriate route mappings and annotations
-
-    ##application.properties
-    - Include database connection configuration
-    - Include JPA/Hibernate settings
-    - Include connection pool settings
+    is_first_chunk = not is_chunk or chunk_index == 0
+    # Unknown chunk types are treated as mixed content
+    variant = (chunk_type if chunk_type in _CONV_CHUNK_INSTRUCTIONS else "mixed") if is_chunk else None
+    # Only the first chunk sets up the database
+    db_section = _build_db_section(db_setup_template) if is_first_chunk else ""
+    requirements_section = _build_requirements_section(business_requirements, technical_requirements)
+
+    # The header is shared by all chunks of a program, so they share the longest possible prompt prefix
+    prompt = _GENERIC_CONVERSION_TEMPLATES[(variant, is_first_chunk)].substitute(
+        header=_build_conversion_header(source_language, target_language, vsam_definition, structured_output),
+        requirements_section=requirements_section,
+        db_section=db_section,
+        chunk_number=chunk_index + 1,
+        total_chunks=total_chunks,
+        chunk_type=chunk_type,
+        source_language=source_language,
+        source_code=source_code
+    )
+    if (business_requirements or technical_requirements) and _over_token_budget((prompt,), max_input_tokens):
+        # The requirements are informational, so drop them rather than overflow the model context
+        return create_code_conversion_prompt(
+            source_language, target_language, source_code, "", "", db_setup_template,
+            vsam_definition, is_chunk, chunk_type, chunk_index, total_chunks,
+            structured_output=structured_output
+        )
+    return prompt
 
-    ##Dependencies
-    - Include all necessary dependencies
-    - Include database dependencies
-    - Include ORM dependencies
 
+@lru_cache(maxsize=64)
+def create_db_usage_reminder(source_language, target_language):
+    """
+    Creates the reminder appended to a single-request conversion prompt to leave out
+    database setup code when the source code does not use a database.
 
-    Each section must be clearly separated using the above headers. Include only relevant code for each layer.
-    Ensure proper dependency injection and relationships between layers are maintained.
-   
+    Args:
+        source_language (str): The programming language of the source code
+        target_language (str): The target programming language for conversion
 
-    {vsam_section}
-    """
-    
-    if is_chunk:
-        base_prompt += f"""
-    **IMPORTANT CHUNKING INFORMATION:**
-    This code is chunk {chunk_index + 1} of {total_chunks} from a larger {source_language} program.
-    Chunk type identified as: {chunk_type}
-    """
-        
-        if chunk_type == "declarations":
-            base_prompt += f"""
-    **Instructions for Declarations Chunk:**
-    - Focus ONLY on converting data structures, file definitions, and variable declarations in this chunk
-    - Generate appropriate class structures, fields, and data types in {target_language}
-    - If needed, create class skeletons but DO NOT implement full methods
-    - Ensure your output can be combined with other chunks (proper scoping)
-    - Only include database connection setup code if this is the first chunk (chunk {chunk_index + 1})
-    - If this is chunk 1, generate appropriate overall program structure
-    - DO NOT add any "placeholder" or "to be implemented" comments for other chunks
-    """
-        
-        elif chunk_type == "procedures":
-            base_prompt += f"""
-    **Instructions for Procedures Chunk:**
-    - Focus ONLY on converting the business logic and procedures in this chunk
-    - Ensure method implementations and logic maintain the exact behavior as the original
-    - Only include necessary method/function definitions needed for this specific chunk
-    - Assume data declarations are handled in other chunks
-    - DO NOT include database connection code unless it's specifically part of this procedure chunk
-    - DO NOT duplicate database initialization that might have been in previous chunks
-    """
-        
-        else:  # mixed type
-            base_prompt += f"""
-    **Instructions for Mixed Content Chunk:**
-    - Convert BOTH declarations and procedures in this chunk as appropriate
-    - Maintain the structure and relationship between declarations and procedures
-    - Only include database initialization if it's actually in this chunk's source code
-    - If this is chunk 1, include appropriate program structure and entry points
-    - If this chunk contains multiple procedures, ensure they're properly organized
-    """
-            
-        base_prompt += f"""
-    **Chunking Guidelines:**
-    - Generate ONLY code for this specific chunk - don't try to complete the entire program
-    - Ensure your code fragment is syntactically correct on its own
-    - Maintain consistent naming across chunks (follow naming patterns in the source)
-    - If this chunk references variables/methods defined in other chunks, continue using those names
+    Returns:
+        str: The database usage reminder
     """
-    
-    base_prompt += f"""
-    **Requirements:**
-    - The output should be a complete, executable implementation in the target language
-    - Maintain all business logic, functionality, and behavior of the original code
-    - Produce idiomatic code following best practices in the target language
-    - Include all necessary class definitions, method implementations, and boilerplate code
-    - Ensure consistent data handling, formatting, and computations
-    - DO NOT include markdown code blocks (like ```java or ```) in your response, just provide the raw code
-    - Do not return any unwanted code in {target_language} or functions which are not in {source_language}.
+    return _DB_USAGE_REMINDER_TMPL.substitute(source_language=source_language, target_language=target_language)
 
-    **Language-Specific Instructions:**
-    - If converting to Java: Produce a fully functional and idiomatic Java implementation with appropriate class structures
-    - If converting to C#: Produce a fully functional and idiomatic C# implementation that matches the original behavior exactly
 
-    **Database-Specific Instructions**
-    - If the {source_language} code includes any database-related operations, automatically generate the necessary setup code
+def create_code_conversion_prompt_batch(
+    source_language,
+    target_language,
+    chunks,
+    business_requirements,
+    technical_requirements,
+    db_setup_template,
+    vsam_definition=""
+):
     """
-    
-    # Only include DB setup template for first chunk or if it's a single chunk
-    if not is_chunk or chunk_index == 0:
-        base_prompt += f"""
-    - Follow this example format for database initialization and setup:
+    Creates a single prompt for converting all chunks of a larger program in one request.
+    Java and C# targets get the instructions of their conversion profile, as in
+    create_java_code_conversion_prompt and create_csharp_code_conversion_prompt.
+    The model labels the output of each chunk with a '##CHUNK n OUTPUT' line so the
+    response can be split with iter_batch_conversion_outputs.
+
+    Args:
+        source_language (str): The programming language of the source code
+        target_language (str): The target programming language for conversion
+        chunks (list): ChunkSpec entries for each chunk, in program order
+        business_requirements (str): The business requirements extracted from analysis
+        technical_requirements (str): The technical requirements extracted from analysis
+        db_setup_template (str): The database setup template for the target language
+        vsam_definition (str): Optional VSAM file definition
 
-    {db_setup_template if db_setup_template else 'No database setup required.'}
+    Returns:
+        str: The prompt for batched code conversion
     """
+    target = _CONVERSION_PROFILE_KEYS.get(target_language.lower())
+    requirements_section = _build_requirements_section(business_requirements, technical_requirements)
+    if target is None:
+        parts = [_build_conversion_header(source_language, target_language, vsam_definition)]
+        parts.append(_CONV_CHUNK_GUIDELINES)
+        parts.append(requirements_section)
+        parts.append(_build_db_section(db_setup_template))
+        chunk_instructions = _CONV_CHUNK_INSTRUCTIONS
+        source_template = _CONV_SOURCE_TMPL
     else:
-        base_prompt += f"""
-    - DO NOT include database initialization code as it should be in chunk 1
+        profile = _CONVERSION_PROFILES[target]
+        chunk_guidelines, chunk_instructions = _BATCH_SECTIONS[target]
+        parts = [_CONVERSION_PREFIXES[target]]
+        parts.append(_TARGET_INPUT_TMPL.substitute(
+            source_language=source_language,
+            vsam_section=_build_vsam_section(vsam_definition, target),
+            requirements_section=requirements_section
+        ))
+        parts.append(_TARGET_DB_TMPL.substitute(
+            framework=profile.framework,
+            db_setup_template=db_setup_template or profile.default_db_setup
+        ))
+        parts.append(chunk_guidelines)
+        source_template = _TARGET_SOURCE_TMPL
+
+    # Include the instructions for each chunk type present, once; unknown types count as mixed
+    for chunk_type in dict.fromkeys(
+        chunk.chunk_type if chunk.chunk_type in chunk_instructions else "mixed" for chunk in chunks
+    ):
+        parts.append(chunk_instructions[chunk_type])
+    parts.append(_CONV_BATCH_TMPL.substitute(total_chunks=len(chunks)))
+
+    chunk_sections = "\n\n".join(
+        f"=== CHUNK {number} === (type={chunk.chunk_type})\n{chunk.source_code}"
+        for number, chunk in enumerate(chunks, start=1)
+    )
+    parts.append(source_template.substitute(
+        source_language=source_language,
+        chunk_label=f" - {len(chunks)} CHUNKS",
+        source_code=chunk_sections
+    ))
+
+    return "".join(parts)
+
+
+def iter_batch_conversion_outputs(text_stream):
     """
+    Yields the output of each chunk of a batched conversion response as soon as it is
+    complete, i.e. when the marker of the next chunk or the end of the response arrives.
+    This lets callers process streamed responses while the model is still generating.
 
-    # Include business and technical requirements for context
-    base_prompt += f"""
-    **Business Requirements:**
-    {business_requirements if business_requirements else 'None provided.'}
-
-    **Technical Requirements:**
-    {technical_requirements if technical_requirements else 'None provided.'}
-
-    **Source Code ({source_language}{' - CHUNK ' + str(chunk_index + 1) + ' of ' + str(total_chunks) if is_chunk else ''}):**
-    {source_code}
+    Args:
+        text_stream (iterable): Consecutive pieces of the model response
 
-    IMPORTANT: Only return the complete converted code WITHOUT any markdown formatting. DO NOT wrap your code in triple backticks (```). Return just the raw code itself.
+    Yields:
+        tuple: (chunk number, converted code) for each '##CHUNK n OUTPUT' section
     """
-
-    if is_chunk:
-        # Add additional reminder for chunked processing
-        base_prompt += f"""
-    REMINDER: You are converting ONLY CHUNK {chunk_index + 1} of {total_chunks}. Do not try to implement logic from other chunks.
-    For database-related operations, only include connection initialization if this is chunk 1 or if the database operations 
-    are specifically in this chunk.
+    buffer = ""
+    scanned = 0
+    chunk_number = None
+    # A trailing None flushes the last, possibly unterminated, line
+    for text in itertools.chain(text_stream, [None]):
+        if text is None:
+            end = len(buffer)
+        else:
+            buffer += text
+            # Markers are whole lines, so only look at completed lines
+            end = buffer.rfind("\n") + 1
+
+        start = 0
+        for marker in _BATCH_OUTPUT_MARKER.finditer(buffer, scanned, end):
+            if chunk_number is not None:
+                yield chunk_number, buffer[start:marker.start()].strip()
+            chunk_number = int(marker.group(1))
+            start = marker.end()
+
+        buffer = buffer[start:]
+        scanned = max(end - start, 0)
+
+    if chunk_number is not None:
+        yield chunk_number, buffer.strip()
+
+
+def format_structured_conversion(conversion_json):
     """
+    Renders a response constrained by CONVERSION_RESPONSE_FORMAT as sectioned code text
+    ('##Entity', '##Repository', ...), the format used for converted code elsewhere.
 
-    base_prompt += f"""
-    **Additional Database Setup Instructions:**
-    If database operations are detected in the source code, include these files in your output:
-
-    ##application.properties
-    - Database connection configuration
-    - JPA/Hibernate settings
-    - Connection pool settings
+    Args:
+        conversion_json (dict): The parsed conversion response
 
-    ##Dependencies
-    - Required database dependencies
-    - Connection pool dependencies
-    - ORM dependencies
+    Returns:
+        str: The converted code, one section per non-empty layer
     """
+    sections = []
+    for field, header in _CONVERSION_FILE_SECTIONS:
+        files = conversion_json.get(field)
+        if files:
+            sections.append(f"##{header}\n" + "\n\n".join(
+                f"FileName: {file.get('fileName', '')}\n{file.get('code', '')}" for file in files
+            ))
+    if conversion_json.get("applicationProperties"):
+        sections.append(f"##application.properties\n{conversion_json['applicationProperties']}")
+    if conversion_json.get("dependencies"):
+        sections.append("##Dependencies\n" + "\n".join(conversion_json["dependencies"]))
+    return "\n\n".join(sections)
+
+
+# Unit testing framework per target language (lowercased)
+_UNIT_TEST_FRAMEWORKS = {
+    "java": "JUnit 5 with Mockito",
+    "c#": "xUnit with Moq",
+    "csharp": "xUnit with Moq",
+}
+
+_TEST_JSON_FORMAT_INSTRUCTION = "Return the response in JSON format."
+
+
+_TEST_CONTEXT_TMPL = Template(dedent("""
+    Business Requirements:
+    ${business_requirements}
 
-    return base_prompt
+    Technical Requirements:
+    ${technical_requirements}
 
+    Converted Code (${target_language}):
 
-def create_unit_test_prompt(target_language, converted_code, business_requirements, technical_requirements):
-    """Create a prompt for generating unit tests for the converted code"""
-    
-    prompt = f"""
-    You are tasked with creating comprehensive unit tests for newly converted {target_language} code.
-    
-    Please generate unit tests for the following {target_language} code. The tests should verify that 
-    the code meets all business requirements and handles edge cases appropriately.
-    
-    Business Requirements:
-    {business_requirements}
-    
-    Technical Requirements:
-    {technical_requirements}
-    
-    Converted Code ({target_language}):
-    
     ```
-    {converted_code}
+    ${converted_code}
     ```
-    
+    """))
+
+_UNIT_TEST_TMPL = Template(dedent("""
+    You are tasked with creating comprehensive unit tests for newly converted ${target_language} code.
+
+    Please generate unit tests for the converted ${target_language} code provided above. The tests should verify that
+    the code meets all business requirements and handles edge cases appropriately.
+
     Guidelines for the unit tests:
-    1. Use appropriate unit testing framework for {target_language} (e.g., JUnit for Java, NUnit/xUnit for C#)
+    1. Use ${framework}
     2. Create tests for all public methods and key functionality
     3. Include positive test cases, negative test cases, and edge cases
     4. Use mocks/stubs for external dependencies where appropriate
@@ -911,32 +1625,17 @@ def create_unit_test_prompt(target_language, converted_code, business_requiremen
     6. Include setup and teardown as needed
     7. Add comments explaining complex test scenarios
     8. Ensure high code coverage, especially for complex business logic
-    
-    Provide ONLY the unit test code without additional explanations.
-    """
-    
-    return prompt
 
+    Provide ONLY the unit test code without additional explanations.
+    """))
 
-def create_functional_test_prompt(target_language, converted_code, business_requirements):
-    """Create a prompt for generating functional test cases based on business requirements"""
-    
-    prompt = f"""
-    You are tasked with creating functional test cases for a newly converted {target_language} application.
+_FUNCTIONAL_TEST_TMPL = Template(dedent("""
+    You are tasked with creating functional test cases for a newly converted ${target_language} application.
     Give response of functional tests in numeric plain text numbering.
-    
-    Please generate comprehensive functional test cases that verify the application meets all business requirements.
+
+    Please generate comprehensive functional test cases that verify the converted application provided above meets all business requirements.
     These test cases will be used by QA engineers to validate the application functionality.
-    
-    Business Requirements:
-    {business_requirements}
-    
-    Converted Code ({target_language}):
-    
-    ```
-    {converted_code}
-    ```
-    
+
     Guidelines for functional test cases:
     1. Create test cases that cover all business requirements
     2. Organize test cases by feature or business functionality
@@ -950,9 +1649,40 @@ def create_functional_test_prompt(target_language, converted_code, business_requ
     4. Include both positive and negative test scenarios
     5. Include test cases for boundary conditions and edge cases
     6. Create end-to-end test scenarios that cover complete business processes
-    
+
     Format your response as a structured test plan document with clear sections and test case tables.
-    Return the respons ein JSON FORMA
+    """) + _TEST_JSON_FORMAT_INSTRUCTION + "\n")
+
+
+def create_test_context_prompt(target_language, converted_code, business_requirements, technical_requirements):
     """
-    
-    return prompt
\ No newline at end of file
+    Creates the context shared by the unit and functional test prompts: the converted code
+    and the requirements it is tested against. It precedes the instructions of both prompts,
+    which refer to the code "provided above", so the code is rendered once for both requests.
+
+    Args:
+        target_language (str): The language of the converted code
+        converted_code (str): The converted code to test
+        business_requirements (str): The business requirements extracted from analysis
+        technical_requirements (str): The technical requirements extracted from analysis
+
+    Returns:
+        str: The shared test generation context
+    """
+    return _TEST_CONTEXT_TMPL.substitute(
+        target_language=target_language,
+        converted_code=converted_code,
+        business_requirements=business_requirements,
+        technical_requirements=technical_requirements
+    )
+
+
+def create_unit_test_prompt(target_language):
+    """Create a prompt for generating unit tests for the converted code given in the test context"""
+    framework = _UNIT_TEST_FRAMEWORKS.get(target_language.lower(), f"the idiomatic unit testing framework for {target_language}")
+    return _UNIT_TEST_TMPL.substitute(target_language=target_language, framework=framework)
+
+
+def create_functional_test_prompt(target_language):
+    """Create a prompt for generating functional test cases based on the business requirements given in the test context"""
+    return _FUNCTIONAL_TEST_TMPL.substitute(target_language=target_language)
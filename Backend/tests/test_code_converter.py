@@ -0,0 +1,138 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("langchain_text_splitters")
+
+import code_converter
+from code_converter import CodeConverter, classify_chunks
+
+DECLARATIONS_CHUNK = """       IDENTIFICATION DIVISION.
+       PROGRAM-ID. ACCOUNTS.
+       DATA DIVISION.
+       WORKING-STORAGE SECTION.
+       01 WS-BALANCE PIC 9(7)V99.
+"""
+
+PROCEDURES_CHUNK = """       PROCEDURE DIVISION.
+           ADD 100 TO WS-BALANCE.
+           DISPLAY WS-BALANCE.
+"""
+
+CHUNK_CODE = {
+    1: "public class Account {\n    private java.math.BigDecimal balance;\n}",
+    2: "public class AccountService {\n    public void deposit() {\n    }\n}",
+}
+
+
+def _message(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _delta(content, finish_reason=None):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content), finish_reason=finish_reason)])
+
+
+class FakeClient:
+    """Answers each kind of request made by CodeConverter and records the requests"""
+
+    def __init__(self, stream_finish_reason="stop"):
+        self.requests = []
+        self.stream_finish_reason = stream_finish_reason
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, stream=False, **kwargs):
+        self.requests.append({"messages": messages, "stream": stream, **kwargs})
+        system, prompt = messages[0]["content"], messages[-1]["content"]
+        if stream:
+            text = "".join(f"##CHUNK {number} OUTPUT\n{code}\n" for number, code in CHUNK_CODE.items())
+            # Split the response mid-line to exercise the incremental marker parsing
+            return iter([_delta(text[:25]), _delta(text[25:]), _delta(None, self.stream_finish_reason)])
+        if "software architect" in system:
+            return _message("class Account; class AccountService")
+        if "code quality" in system:
+            return _message("```java\n" + prompt.split("```java\n", 1)[-1].split("\n```", 1)[0] + "\n```")
+        number = 1 if "WORKING-STORAGE" in prompt else 2
+        return _message(json.dumps({
+            "convertedCode": CHUNK_CODE[number],
+            "conversionNotes": f"chunk {number}",
+            "potentialIssues": [],
+            "databaseUsed": False
+        }))
+
+    def user_prompts(self, stream):
+        return [request["messages"][-1]["content"] for request in self.requests if request["stream"] == stream]
+
+
+def test_classify_chunks():
+    assert classify_chunks([DECLARATIONS_CHUNK, PROCEDURES_CHUNK], "COBOL") == ["declarations", "procedures"]
+    assert classify_chunks([DECLARATIONS_CHUNK + PROCEDURES_CHUNK, "DISPLAY 'DONE'."], "COBOL") == ["mixed", "procedures"]
+    assert classify_chunks(["x = 1", "y = 2"], "Python") == ["mixed", "mixed"]
+
+
+def test_convert_code_chunks_in_one_batched_request():
+    client = FakeClient()
+    converter = CodeConverter(client, "test-model")
+
+    result = converter.convert_code_chunks(
+        chunks=[DECLARATIONS_CHUNK, PROCEDURES_CHUNK],
+        source_language="COBOL",
+        target_language="Java",
+        vsam_definition="",
+        business_requirements="Track account balances",
+        technical_requirements="Use BigDecimal",
+        db_setup_template=""
+    )
+
+    (batch_prompt,) = client.user_prompts(stream=True)
+    assert "Spring Boot" in batch_prompt
+    assert "CRITICAL INSTRUCTIONS FOR COBOL TO JAVA/C# CONVERSION" in batch_prompt
+    assert "=== CHUNK 1 === (type=declarations)" in batch_prompt
+    assert "=== CHUNK 2 === (type=procedures)" in batch_prompt
+    assert "class Account" in result["convertedCode"]
+    assert "class AccountService" in result["convertedCode"]
+    assert result["databaseUsed"] is False
+
+
+def test_convert_code_chunks_concurrently_when_batch_does_not_fit(monkeypatch):
+    monkeypatch.setattr(code_converter, "BATCH_MAX_OUTPUT_TOKENS", 0)
+    client = FakeClient()
+    converter = CodeConverter(client, "test-model")
+
+    result = converter.convert_code_chunks(
+        chunks=[DECLARATIONS_CHUNK, PROCEDURES_CHUNK],
+        source_language="COBOL",
+        target_language="Java",
+        vsam_definition="",
+        business_requirements="",
+        technical_requirements="",
+        db_setup_template=""
+    )
+
+    assert client.user_prompts(stream=True) == []
+    chunk_prompts = [prompt for prompt in client.user_prompts(stream=False) if "from the complete source code" in prompt]
+    assert len(chunk_prompts) == 2
+    assert "Chunk 1: chunk 1\n\nChunk 2: chunk 2" in result["conversionNotes"]
+    assert "class Account" in result["convertedCode"]
+    assert "class AccountService" in result["convertedCode"]
+
+
+def test_convert_code_chunks_individually_when_batch_is_cut_off():
+    client = FakeClient(stream_finish_reason="length")
+    converter = CodeConverter(client, "test-model")
+
+    result = converter.convert_code_chunks(
+        chunks=[DECLARATIONS_CHUNK, PROCEDURES_CHUNK],
+        source_language="COBOL",
+        target_language="Java",
+        vsam_definition="",
+        business_requirements="",
+        technical_requirements="",
+        db_setup_template=""
+    )
+
+    assert len(client.user_prompts(stream=True)) == 1
+    chunk_prompts = [prompt for prompt in client.user_prompts(stream=False) if "from the complete source code" in prompt]
+    assert len(chunk_prompts) == 2
+    assert "Chunk 1: chunk 1\n\nChunk 2: chunk 2" in result["conversionNotes"]
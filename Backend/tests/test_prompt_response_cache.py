@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from prompt_response_cache import clear_cache, get_or_generate, normalize_source_code
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_cache()
+    yield
+    clear_cache()
+
+
+def is_json(text):
+    try:
+        json.loads(text)
+        return True
+    except json.JSONDecodeError:
+        return False
+
+
+def test_normalize_keeps_significant_whitespace():
+    source = "       DISPLAY 'A  B'.   \r\n       STOP RUN.\r\n"
+    assert normalize_source_code(source) == "       DISPLAY 'A  B'.\n       STOP RUN."
+    assert normalize_source_code("DISPLAY 'A  B'.") != normalize_source_code("DISPLAY 'A B'.")
+
+
+def test_complete_response_is_reused():
+    calls = []
+
+    def llm_fn():
+        calls.append(1)
+        return '{"ok": true}'
+
+    params = {"source_code": "       STOP RUN.\r\n"}
+    assert get_or_generate("kind", params, llm_fn, is_json) == '{"ok": true}'
+    assert get_or_generate("kind", {"source_code": "       STOP RUN.  \n"}, llm_fn, is_json) == '{"ok": true}'
+    assert len(calls) == 1
+
+
+def test_incomplete_response_is_not_cached():
+    responses = iter(['{"truncated": ', '{"ok": true}'])
+
+    def llm_fn():
+        return next(responses)
+
+    assert get_or_generate("kind", {"source_code": "X"}, llm_fn, is_json) == '{"truncated": '
+    assert get_or_generate("kind", {"source_code": "X"}, llm_fn, is_json) == '{"ok": true}'
@@ -0,0 +1,98 @@
+import prompts
+
+
+class OfflineTiktoken:
+    """Stands in for tiktoken when its encoding files cannot be downloaded"""
+
+    @staticmethod
+    def encoding_for_model(model):
+        raise ConnectionError("encoding download blocked")
+
+    @staticmethod
+    def get_encoding(name):
+        raise ConnectionError("encoding download blocked")
+
+
+def test_count_tokens_estimates_when_encoding_cannot_load(monkeypatch):
+    monkeypatch.setattr(prompts, "tiktoken", OfflineTiktoken)
+    prompts._get_encoding.cache_clear()
+    try:
+        assert prompts.count_tokens("x" * 400) == 100
+    finally:
+        prompts._get_encoding.cache_clear()
+
+
+SOURCE = "       DISPLAY 'HELLO'."
+
+
+def test_java_conversion_prompt():
+    prompt = prompts.create_java_code_conversion_prompt("COBOL", SOURCE, "Greet users", "Use Java 17", "DB SETUP")
+    assert "translated into its exact equivalent in Java, maintaining a clean Spring Boot layered architecture" in prompt
+    for section in ("##Entity", "##Repository", "##Service", "##Controller", "##application.properties", "##Dependencies"):
+        assert section in prompt
+    assert "**Business Requirements:**\nGreet users" in prompt
+    assert "**Technical Requirements:**\nUse Java 17" in prompt
+    assert "- Follow this example format for Spring Boot database configuration:\n\nDB SETUP" in prompt
+    assert prompt.endswith(f"**Source Code (COBOL):**\n{SOURCE}\n")
+
+
+def test_csharp_chunk_conversion_prompt():
+    prompt = prompts.create_csharp_code_conversion_prompt(
+        "COBOL", SOURCE, "", "", "", is_chunk=True, chunk_type="procedures", chunk_index=1, total_chunks=3
+    )
+    assert "translated into its exact equivalent in C#" in prompt
+    assert "This code is chunk 2 of 3 from a larger COBOL program." in prompt
+    assert "**Instructions for Procedures Chunk:**" in prompt
+    assert "- DO NOT include database configuration as it should be in chunk 1" in prompt
+    assert "REMINDER: You are converting ONLY CHUNK 2 of 3." in prompt
+    assert "**Business Requirements:**" not in prompt
+    assert f"**Source Code (COBOL - CHUNK 2 of 3):**\n{SOURCE}" in prompt
+
+
+def test_generic_conversion_prompt():
+    prompt = prompts.create_code_conversion_prompt("COBOL", "Python", SOURCE, "Greet users", "", "DB SETUP")
+    assert "Convert the following COBOL code into its exact equivalent in Python" in prompt
+    assert "##Entity" in prompt
+    assert "**Business Requirements:**\nGreet users" in prompt
+    assert "**Technical Requirements:**" not in prompt
+    assert "**Database Configuration:**\n- Follow this example format for database initialization and setup:\n\nDB SETUP" in prompt
+    assert f"**Source Code (COBOL):**\n{SOURCE}\n" in prompt
+    assert "Only return the complete converted code WITHOUT any markdown formatting" in prompt
+
+
+def test_technical_requirements_prompt():
+    prompt = prompts.create_technical_requirements_prompt("COBOL", "Java", SOURCE)
+    assert "Frame each requirement as 'The system must [capability]'" in prompt
+    assert "kindat each requirement" not in prompt
+    assert SOURCE in prompt
+
+
+def test_test_prompts():
+    context = prompts.create_test_context_prompt("Java", "class Greeter {}", "Greet users", "Use Java 17")
+    assert "class Greeter {}" in context
+    assert "Greet users" in context
+    assert "JUnit 5" in prompts.create_unit_test_prompt("Java")
+    assert "xUnit" in prompts.create_unit_test_prompt("C#")
+    functional = prompts.create_functional_test_prompt("Java")
+    assert "Guidelines for functional test cases:" in functional
+    assert "Return the response in JSON format." in functional
+
+
+def test_cached_prompt_is_keyed_by_argument_digest(monkeypatch):
+    monkeypatch.setattr(prompts, "PROMPT_CACHE_SIZE", 1)
+    calls = []
+
+    def build(source_code, requirements=None):
+        calls.append(source_code)
+        return f"prompt for {source_code}"
+
+    cached_build = prompts._cached_prompt(build)
+    assert cached_build("A", requirements={"rules": []}) == cached_build("A", requirements={"rules": []})
+    cached_build("B")
+    cached_build("A", requirements={"rules": []})
+    assert calls == ["A", "B", "A"]
+
+
+def test_prompt_caching_is_off_when_size_is_zero(monkeypatch):
+    monkeypatch.setattr(prompts, "PROMPT_CACHE_SIZE", 0)
+    assert prompts._cached_prompt(len) is len